@@ -1,13 +1,22 @@
 {
     "name": "PG BD Connection",
-    "version": "1.0",
+    "version": "1.1",
     "summary": "Sync invoices between two Odoo databases",
     "description": "Adds a button to replicate invoices to another Odoo 17 database.",
     "author": "Your Name",
     "category": "Accounting",
     "depends": ["account", "sale", "account_reports", "web"],
     "data": [
+        "security/ir.model.access.csv",
+        "data/ir_cron.xml",
+        "data/pg_sync_config_data.xml",
+        "data/pg_sync_prepare.xml",
         "views/account_move_view.xml",
+        "views/sync_config_views.xml",
+        "views/sync_job_views.xml",
+        "views/sync_log_views.xml",
+        "views/sync_check_views.xml",
+        "views/sale_order_views.xml",
         "views/report_ledger_highlight.xml",
     ],
     "assets": {
@@ -0,0 +1,25 @@
+from odoo.tools.sql import column_exists, create_column
+
+# Same size as ORDER_LINE_SUMMARY_SIZE in models/sale_order.py
+ORDER_LINE_SUMMARY_SIZE = 250
+
+
+def migrate(cr, version):
+    """
+    Create and fill sale_order.order_line_summary with one grouped UPDATE, before the
+    ORM creates the column and recomputes it order by order.
+    """
+    if column_exists(cr, "sale_order", "order_line_summary"):
+        return
+    create_column(cr, "sale_order", "order_line_summary", "varchar")
+    cr.execute("""
+        UPDATE sale_order o
+           SET order_line_summary = CASE WHEN length(d.description) > %(size)s
+                                         THEN left(d.description, %(size)s - 1) || '…'
+                                         ELSE d.description END
+          FROM (SELECT order_id, string_agg(name, ', ' ORDER BY sequence, id) AS description
+                  FROM sale_order_line
+                 WHERE name IS NOT NULL AND name != ''
+              GROUP BY order_id) d
+         WHERE o.id = d.order_id
+    """, {"size": ORDER_LINE_SUMMARY_SIZE})
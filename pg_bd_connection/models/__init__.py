@@ -1,4 +1,12 @@
+from . import sync_map
+from . import sync_cache
+from . import sync_job
+from . import sync_log
+from . import sync_transaction
+from . import sync_config
 from . import account_move
 from . import account_payment
+from . import sync_check
 from . import sale_order
+from . import aged_receivable_snapshot
 from . import account_reports
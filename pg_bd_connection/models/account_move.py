@@ -1,189 +1,526 @@
+import hashlib
+import json
 import logging
-import odoo
-from psycopg2 import sql
+from datetime import datetime, timedelta
+from itertools import zip_longest
+
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+
+from .sync_cache import resolve_partners, resolve_sale_journal, resolve_taxes
+from .sync_log import SyncRun
+from .sync_transaction import TwoPhaseCommit
 
 _logger = logging.getLogger(__name__)
 
+CDC_PARAM = "pg_bd_connection.cdc_high_water_mark"
+CDC_JOURNALS_PARAM = "pg_bd_connection.cdc_journal_ids"
+CDC_MOVE_TYPES = ("out_invoice", "out_refund")
+# write_date is the start of the writing transaction: moves committed after a capture run
+# can be older than its mark, so every run rescans this window below the mark
+CDC_OVERLAP = timedelta(minutes=10)
+
+
+def _run_batched(cr, records, operation, errors):
+    """
+    Apply ``operation`` to ``records`` in one go; if that fails, retry record by record
+    so a single bad record does not abort the rest. Failures are stored in ``errors``
+    (record id -> message) and the records that succeeded are returned.
+    """
+    if not records:
+        return records
+    try:
+        with cr.savepoint():
+            operation(records)
+        return records
+    except Exception as e:
+        _logger.warning("⚠ Batch operation failed for %s, retrying one by one: %s", records, str(e))
+
+    done = records.browse()
+    for record in records:
+        try:
+            with cr.savepoint():
+                operation(record)
+            done |= record
+        except Exception as e:
+            errors[record.id] = str(e)
+    return done
+
+
+def _sync_hash(vals):
+    """Stable digest of the values sent to the second database."""
+    return hashlib.sha256(json.dumps(vals, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _sync_update_replica(replica, vals):
+    """
+    Update a draft replica in place: only header fields that differ are written and
+    the invoice lines are diffed position by position against the new ones.
+    """
+    header = {
+        key: value for key, value in vals.items()
+        if key not in ("invoice_line_ids", "state") and not _same_value(replica, key, value)
+    }
+
+    line_commands = []
+    new_lines = [command[2] for command in vals["invoice_line_ids"]]
+    old_lines = list(replica.invoice_line_ids.sorted(lambda l: (l.sequence, l.id)))
+    for line, line_vals in zip_longest(old_lines, new_lines):
+        if line_vals is None:
+            line_commands.append((2, line.id))
+        elif line is None:
+            line_commands.append((0, 0, line_vals))
+        elif line.display_type != line_vals.get("display_type", "product"):
+            line_commands += [(2, line.id), (0, 0, line_vals)]
+        else:
+            changes = {key: value for key, value in line_vals.items() if not _same_value(line, key, value)}
+            if changes:
+                line_commands.append((1, line.id, changes))
+
+    if line_commands:
+        header["invoice_line_ids"] = line_commands
+    if header:
+        replica.write(header)
+
+
+def _same_value(record, fname, value):
+    field = record._fields[fname]
+    current = record[fname]
+    if field.type == "many2one":
+        return current.id == (value or False)
+    if field.type in ("many2many", "one2many"):
+        ids = value[0][2] if value else []
+        return set(current.ids) == set(ids)
+    if field.type == "float":
+        return float_compare(current, value or 0.0, precision_digits=6) == 0
+    return (current or False) == (value or False)
 
-def _ensure_column(env, table, column, column_def):
-    """Ensure a column exists in the given table."""
-    env.cr.execute(
-        """SELECT 1 FROM information_schema.columns
-            WHERE table_name=%s AND column_name=%s""",
-        (table, column),
-    )
-    if not env.cr.fetchone():
-        _logger.warning("Column %s.%s missing. Creating it.", table, column)
-        env.cr.execute(
-            sql.SQL("ALTER TABLE {} ADD COLUMN {} {}")
-            .format(sql.Identifier(table), sql.Identifier(column), sql.SQL(column_def))
-        )
-        env.cr.commit()
 
 class AccountMove(models.Model):
     _inherit = "account.move"
 
-    x_original_invoice_id = fields.Integer(string="Original Invoice ID", copy=False)  # ✅ Ensure field exists
+    x_original_invoice_id = fields.Integer(string="Original Invoice ID", copy=False, index="btree_not_null")  # ✅ Ensure field exists
+
+    def init(self):
+        super().init()
+        # Range scanned by the change-data-capture cron, ordered like its high-water mark
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_move_pg_cdc_index
+                ON account_move (write_date, id)
+             WHERE state = 'posted'
+        """)
+
+    @api.model
+    def _cdc_get_high_water_mark(self):
+        """Return the ``(write_date, id)`` of the last move captured, or ``None``."""
+        value = self.env["ir.config_parameter"].sudo().get_param(CDC_PARAM)
+        if not value:
+            return None
+        write_date, move_id = value.rsplit("|", 1)
+        return fields.Datetime.to_datetime(write_date), int(move_id)
+
+    @api.model
+    def _cdc_set_high_water_mark(self, write_date, move_id):
+        self.env["ir.config_parameter"].sudo().set_param(
+            CDC_PARAM, f"{fields.Datetime.to_string(write_date)}|{move_id}",
+        )
 
-    def action_sync_invoice(self):
+    @api.model
+    def _cdc_reset_high_water_mark(self, since):
+        """Make the next capture run start from ``since`` (e.g. the start of a fiscal year) to catch up."""
+        self._cdc_set_high_water_mark(fields.Datetime.to_datetime(since), 0)
+
+    @api.model
+    def _cron_capture_posted_invoices(self, batch_size=500, max_batches=20):
         """
-        Sync invoice with another Odoo database and confirm the invoice in the first database if not confirmed yet.
+        Change-data-capture of posted customer invoices: every move posted or changed since
+        the ``(write_date, id)`` high-water mark is queued for sync, in bounded batches.
+        Each batch is an index range scan on ``account_move_pg_cdc_index`` and the mark is
+        committed with the queued jobs, so an interrupted run resumes where it stopped.
+        The scan starts ``CDC_OVERLAP`` before the mark. Moves found again there are not
+        queued twice while their job is pending, and the sync skips them through the
+        content hash stored in ``pg.sync.map`` (also for replicas it can no longer update).
         """
-        _logger.info("🔄 Starting invoice synchronization for Invoice ID: %s", self.id)
+        ICP = self.env["ir.config_parameter"].sudo()
+        journal_ids = [int(j) for j in (ICP.get_param(CDC_JOURNALS_PARAM) or "").split(",") if j.strip()]
+        high_water_mark = self._cdc_get_high_water_mark()
+        mark = (high_water_mark[0] - CDC_OVERLAP, 0) if high_water_mark else (datetime.min, 0)
+
+        for _batch in range(max_batches):
+            self.flush_model(["write_date", "state", "move_type", "journal_id"])
+            self.env.cr.execute("""
+                SELECT id, write_date FROM account_move
+                 WHERE state = 'posted'
+                   AND (write_date, id) > (%s, %s)
+                   AND move_type IN %s
+                   AND (%s OR journal_id = ANY(%s::int[]))
+              ORDER BY write_date, id
+                 LIMIT %s
+            """, (mark[0], mark[1], CDC_MOVE_TYPES, not journal_ids, journal_ids, batch_size))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+
+            # Unchanged moves are detected by the sync through their content hash
+            to_sync = self.browse([row[0] for row in rows])
+            self.env["pg.sync.job"]._enqueue(to_sync)
+
+            mark = (rows[-1][1], rows[-1][0])
+            if not high_water_mark or mark > high_water_mark:
+                high_water_mark = mark
+                self._cdc_set_high_water_mark(*mark)
+            self.env.cr.commit()
+            _logger.info("📡 CDC queued %s move(s), high-water mark %s", len(to_sync), high_water_mark)
+
+            if len(rows) < batch_size:
+                break
+
+    def action_queue_sync_invoice(self):
+        """Queue the invoices for synchronization by the background workers."""
+        jobs = self.env["pg.sync.job"]._enqueue(self)
+        return jobs._queued_notification()
 
-        # Define the first and second database names
-        first_db = "PICCOLO"
-        second_db = "PICCOLO_COMMUNITY"
+    def action_sync_invoice(self):
+        """
+        Sync invoices with another Odoo database and confirm them in the first database if not confirmed yet.
+        """
+        errors = self._sync_to_community()
+        if len(self) == 1:
+            if errors:
+                raise ValueError(errors[self.id])
+            return True
+        return self.env["pg.sync.job"]._result_notification(self, errors)
 
-        # ✅ Ensure Invoice is Updated & Confirmed in the First Database
-        try:
-            registry = odoo.registry(first_db)
-            if not registry:
-                raise ValueError(f"❌ Registry for database {first_db} not found!")
+    def _sync_from_queue(self):
+        return self._sync_to_community()
 
-            with registry.cursor() as cr:
-                first_env = api.Environment(cr, self.env.uid, {})
+    def _sync_to_community(self):
+        """
+        Works on the whole recordset: each database cursor is opened once per batch, partners,
+        taxes and the sales journal are resolved up front and all target invoices are created
+        with a single ``create`` call. Failures are reported per invoice without aborting the
+        rest; returns a dict invoice id -> error message for the invoices that failed.
+        Every run is recorded in ``pg.sync.log`` with the time and queries of each stage.
+        """
+        _logger.info("🔄 Starting invoice synchronization for %s invoice(s): %s", len(self), self.ids)
 
-                # 🔍 Search for the original invoice in the first database
-                original_invoice = first_env["account.move"].sudo().search([("id", "=", self.id)], limit=1)
+        config = self.env["pg.sync.config"]._get_config()
+        if config.commit_mode == "two_phase" and config.source_db == self.env.cr.dbname:
+            raise UserError(_("Two-Phase Commit cannot be used when the source database is this one."))
 
-                if not original_invoice:
-                    raise ValueError(f"❌ No matching invoice found in first database for ID {self.id}")
+        with SyncRun(self.env, "account.move", self) as run:
+            if config.commit_mode == "two_phase":
+                synced = self._sync_two_phase(config, run)
+            else:
+                synced = self._sync_sequential(config, run)
+            errors = run.errors
 
-                # ✅ Change Journal ID First (Before Confirming)
-                _logger.info("🔄 Changing journal_id to 50 in first database...")
-                original_invoice.sudo().write({"journal_id": 50})
-                cr.commit()
-                _logger.info("✅ journal_id successfully changed to 50.")
+            # Synced invoices were flagged by the transaction that posted them
+            with run.stage("finalize"):
+                if synced:
+                    for invoice in synced:
+                        invoice.message_post(body=_("✅ Invoice successfully synced."))
 
-                # ✅ If the invoice is not posted, confirm it
-                if original_invoice.state != "posted":
-                    _logger.info("✅ Confirming invoice in first database: %s", original_invoice.id)
-                    original_invoice.sudo().action_post()
-                    cr.commit()
-                    _logger.info("✅ Invoice successfully confirmed in first database.")
+                for invoice in self.filtered(lambda m: m.id in errors):
+                    invoice.message_post(body=_("❌ Invoice sync failed: %s") % errors[invoice.id])
 
-        except Exception as e:
-            _logger.error("❌ Failed to confirm invoice in first database: %s", str(e))
-            raise ValueError(_("Could not confirm invoice in first database: %s") % str(e))
+        return errors
 
-        # ✅ Proceed with syncing the invoice to the second database
+    def _sync_sequential(self, config, run):
+        """
+        Post the invoices in the source database and commit, then replicate them in the
+        target database. An invoice whose replication fails stays posted in the source
+        database. When the source database is the one of this transaction, the invoices are
+        posted and flagged in this transaction, which the caller commits.
+        Returns the invoices synced; failures are added to ``run.errors``.
+        """
+        errors = run.errors
+
+        # ✅ Ensure Invoices are Updated & Confirmed in the First Database. When it is the
+        # database of this transaction they are posted here: rows updated and committed by a
+        # second connection could not be written again by this one (REPEATABLE READ).
+        local_source = config.source_db == self.env.cr.dbname
+        if local_source:
+            self._sync_confirm_in_source(self.env.cr, config, errors, run)
+        else:
+            try:
+                with config._source_cursor(run) as cr:
+                    self._sync_confirm_in_source(cr, config, errors, run)
+                    with run.stage("commit"):
+                        cr.commit()
+
+            except Exception as e:
+                _logger.error("❌ Failed to confirm invoices in first database: %s", str(e))
+                raise ValueError(_("Could not confirm invoice in first database: %s") % str(e))
+
+        # ✅ Proceed with syncing the invoices to the second database
+        invoices = self.filtered(lambda m: m.id not in errors)
         try:
-            registry = odoo.registry(second_db)
-            if not registry:
-                raise ValueError(f"❌ Registry for database {second_db} not found!")
-
-            with registry.cursor() as cr:
-                second_env = api.Environment(cr, self.env.uid, {})
-
-                # 🔹 Force access to all companies
-                companies = second_env["res.company"].sudo().search([]).ids
-                if not companies:
-                    raise ValueError(f"❌ No companies found in database {second_db}")
-
-                second_env = api.Environment(cr, self.env.uid, {
-                    "allowed_company_ids": companies,
-                    "force_company": companies[0],
-                })
-
-                _logger.info("✅ Successfully switched to database: %s with full company access", second_db)
-
-                # 🔹 Assign company access
-                second_env.user_id = second_env["res.users"].browse(self.env.uid).sudo()
-                second_env.user_id.sudo().write({
-                    "company_ids": [(6, 0, companies)],
-                    "company_id": companies[0],
-                })
-
-                # Ensure required columns exist
-                _ensure_column(second_env, "account_move", "delivery_count", "INTEGER DEFAULT 0")
-
-                # ---- 1. Ensure Customer Exists ----
-                customer = second_env["res.partner"].sudo().search([("name", "=", self.partner_id.name)], limit=1)
-
-                if not customer:
-                    _logger.info("🔄 Customer not found. Creating new customer: %s", self.partner_id.name)
-                    customer = second_env["res.partner"].sudo().create({
-                        "name": self.partner_id.name,
-                        "email": self.partner_id.email,
-                        "phone": self.partner_id.phone,
-                        "street": self.partner_id.street,
-                        "city": self.partner_id.city,
-                        "zip": self.partner_id.zip,
-                        "country_id": self.partner_id.country_id.id if self.partner_id.country_id else False,
-                        "vat": self.partner_id.vat,
-                        "customer_rank": 1,
-                    })
-                    _logger.info("✅ New customer created: ID %s", customer.id)
-
-                # ---- 2. Ensure Journal Exists ----
-                journal = second_env["account.journal"].sudo().search([("type", "=", "sale")], limit=1)
-                if not journal:
-                    raise ValueError("❌ No sales journal found in second database!")
-
-                if not journal.default_account_id:
-                    raise ValueError(f"❌ Journal {journal.name} does not have a default account assigned!")
-
-                account_id = journal.default_account_id.id
-
-                # ---- 3. Ensure Invoice Lines in Correct Order ----
-                invoice_lines = []
-                for line in self.invoice_line_ids.sorted(lambda l: l.sequence):
-                    if line.display_type in ["line_section", "line_note"]:
-                        invoice_lines.append((0, 0, {
-                            "display_type": line.display_type,
-                            "name": line.name,
-                            "sequence": line.sequence,
-                        }))
-                        continue
-
-                    tax_ids = [
-                        second_env["account.tax"].sudo().search([("name", "=", tax.name)], limit=1).id
-                        for tax in line.tax_ids
-                        if second_env["account.tax"].sudo().search([("name", "=", tax.name)], limit=1)
-                    ]
-
-                    invoice_lines.append((0, 0, {
-                        "name": line.name,
-                        "quantity": line.quantity or 0.0,
-                        "price_unit": line.price_unit or 0.0,
-                        "discount": line.discount or 0.0,
-                        "tax_ids": [(6, 0, tax_ids)] if tax_ids else [],
-                        "account_id": account_id,
-                        "sequence": line.sequence,
-                    }))
-
-                invoice_data = {
-                    "partner_id": customer.id,
-                    "move_type": self.move_type,
-                    "invoice_date": self.invoice_date,
-                    "invoice_date_due": self.invoice_date_due,
-                    "payment_reference": self.payment_reference,
-                    "state": "draft",
-                    "invoice_line_ids": invoice_lines,
-                    "journal_id": journal.id,
-                }
-
-                # ✅ Check if `x_original_invoice_id` Exists in the 2nd Database Before Using
-                if "x_original_invoice_id" in second_env["account.move"]._fields:
-                    invoice_data["x_original_invoice_id"] = self.id
-
-                try:
-                    new_invoice = second_env["account.move"].sudo().create(invoice_data)
-                    _logger.info("✅ Invoice successfully created in the second database: ID %s", new_invoice.id)
-
-                    # ✅ Mark as Synced
-                    self.sudo().write({"x_studio_community": True})
-                    _logger.info("✅ Invoice marked as synced (x_studio_community = True)")
-
-                    self.message_post(body=_("✅ Invoice successfully synced."))
-                    return True
-                except Exception as e:
-                    _logger.error("❌ Failed to create invoice in the second database: %s", str(e))
-                    raise ValueError(_("Failed to create invoice in the second database: %s") % str(e))
+            with config._target_env(self.env.uid, run) as second_env:
+                _logger.info("✅ Successfully switched to database: %s with full company access", config.target_db)
+                synced = invoices._sync_replicate(second_env, config, errors, run)
+                with run.stage("commit"):
+                    second_env.cr.commit()
 
         except Exception as e:
             _logger.error("❌ Failed to switch to second database: %s", str(e))
             raise ValueError(_("Could not access the second database: %s") % str(e))
 
+        with run.stage("finalize"):
+            if local_source:
+                synced._sync_mark_synced(self.env.cr)
+            elif synced:
+                with config._source_cursor(run) as cr:
+                    synced._sync_mark_synced(cr)
+                    cr.commit()
+        return synced
+
+    def _sync_two_phase(self, config, run):
+        """
+        Post the invoices in the source database and replicate them in the target database
+        within one two-phase commit, so an invoice is only posted if its replica is committed
+        as well. A batch in which any invoice fails is rolled back entirely and retried
+        invoice by invoice. Returns the invoices synced; failures are added to ``run.errors``.
+        """
+        errors = {}
+        synced = self.browse()
+        tpc = TwoPhaseCommit(self.env)
+        try:
+            # Opened first so it is closed after the cursors that roll the transaction back
+            with self.env.registry.cursor() as map_cr, config._source_cursor(run, tpc) as cr, \
+                    config._target_env(self.env.uid, run, tpc) as second_env:
+                # The sync map of this database is part of the transaction as well
+                tpc.begin(map_cr, "map")
+                map_env = api.Environment(map_cr, self.env.uid, {})
+                _logger.info("✅ Two-phase transaction %s opened on %s and %s", tpc.name, config.source_db, config.target_db)
+                self._sync_confirm_in_source(cr, config, errors, run)
+                invoices = self.filtered(lambda m: m.id not in errors)
+                synced = invoices._sync_replicate(second_env, config, errors, run, map_env)
+                if not errors:
+                    with run.stage("finalize"):
+                        synced._sync_mark_synced(cr)
+                with run.stage("commit"):
+                    if errors:
+                        tpc.rollback()
+                    else:
+                        tpc.commit()
+
+        except Exception as e:
+            if tpc.decided or len(self) == 1:
+                # Once the decision is stored the transaction belongs to the recovery cron
+                _logger.error("❌ Two-phase sync %s failed: %s", tpc.name, str(e))
+                raise ValueError(_("Could not sync the invoices: %s") % str(e))
+            errors = {invoice.id: str(e) for invoice in self}
+
+        if not errors:
+            return synced
+        if len(self) == 1:
+            run.errors.update(errors)
+            return self.browse()
+
+        _logger.warning("⚠ Two-phase sync of %s invoice(s) rolled back, retrying one by one", len(self))
+        synced = self.browse()
+        for invoice in self:
+            try:
+                synced |= invoice._sync_two_phase(config, run)
+            except Exception as e:
+                run.errors[invoice.id] = str(e)
+        return synced
+
+    def _sync_confirm_in_source(self, cr, config, errors, run):
+        """Set the configured sales journal on the invoices of the source database and post them."""
+        source_journal_id = config.source_sale_journal_id
+        first_env = api.Environment(cr, self.env.uid, {})
+
+        with run.stage("post"):
+            # 🔍 Search for the original invoices in the first database
+            original_invoices = first_env["account.move"].sudo().browse(self.ids).exists()
+            for missing_id in set(self.ids) - set(original_invoices.ids):
+                errors[missing_id] = f"❌ No matching invoice found in first database for ID {missing_id}"
+
+            # ✅ Change Journal ID First (Before Confirming)
+            to_rejournal = original_invoices.filtered(lambda m: m.state != "posted" and m.journal_id.id != source_journal_id)
+            _logger.info("🔄 Changing journal_id to %s in first database for %s invoice(s)...", source_journal_id, len(to_rejournal))
+            _run_batched(cr, to_rejournal, lambda moves: moves.write({"journal_id": source_journal_id}), errors)
+
+            # ✅ Confirm the invoices that are not posted yet
+            to_post = original_invoices.filtered(lambda m: m.state != "posted" and m.id not in errors)
+            _logger.info("✅ Confirming %s invoice(s) in first database", len(to_post))
+            _run_batched(cr, to_post, lambda moves: moves.action_post(), errors)
+
+    def _sync_mark_synced(self, cr):
+        """
+        Set ``x_studio_community`` on the invoices through ``cr``, the cursor of the
+        transaction that posted them in the source database.
+        """
+        source_moves = api.Environment(cr, self.env.uid, {})["account.move"].sudo().browse(self.ids)
+        to_flag = source_moves.filtered(lambda m: not m.x_studio_community)
+        if to_flag:
+            to_flag.write({"x_studio_community": True})
+            to_flag.flush_recordset(["x_studio_community"])
+            _logger.info("✅ %s invoice(s) marked as synced (x_studio_community = True)", len(to_flag))
+
+    def _sync_replicate(self, second_env, config, errors, run, map_env=None):
+        """
+        Create or update the replicas of the invoices in ``second_env`` without committing.
+        The sync map is written through ``map_env`` when given (a cursor enlisted in a
+        two-phase commit), else through the current cursor.
+        Returns the invoices created or updated; failures are added to ``errors``.
+        """
+        cr = second_env.cr
+        synced = self.browse()
+
+        # ---- 1. Ensure Customers Exist ----
+        with run.stage("partner"):
+            customer_ids = resolve_partners(self.partner_id, second_env)
+
+        # ---- 2. Ensure Journal Exists ----
+        with run.stage("journal"):
+            journal_id, account_id = resolve_sale_journal(self.env, second_env, config.target_sale_journal_id)
+
+        # ---- 3. Resolve Taxes and Build the Invoice Values ----
+        with run.stage("lines"):
+            tax_ids = resolve_taxes(self.invoice_line_ids.tax_ids, second_env)
+            has_original_id = "x_original_invoice_id" in second_env["account.move"]._fields
+            company_map = config._company_map()
+            replicas = self._sync_find_replicas(second_env)
+
+            vals_by_invoice = {}  # invoices without replica
+            to_update = []  # (invoice, draft replica, values, digest)
+            target_ids = {}  # source invoice id -> target invoice id
+            hashes = {}  # source invoice id -> digest of the replicated values
+            unchanged = self.browse()
+            for invoice in self:
+                invoice_data = invoice._sync_invoice_vals(
+                    customer_ids[invoice.partner_id.id], journal_id, account_id, tax_ids,
+                )
+                if has_original_id:
+                    invoice_data["x_original_invoice_id"] = invoice.id
+                if invoice.company_id.id in company_map:
+                    invoice_data["company_id"] = company_map[invoice.company_id.id]
+                digest = _sync_hash(invoice_data)
+
+                replica, old_digest = replicas.get(invoice.id, (None, None))
+                if not replica:
+                    vals_by_invoice[invoice] = invoice_data
+                    hashes[invoice.id] = digest
+                    continue
+
+                target_ids[invoice.id] = replica.id
+                if digest == old_digest:
+                    unchanged |= invoice
+                elif replica.state != "draft":
+                    _logger.info("⏭ Replica %s of invoice %s is %s, not updated", replica.id, invoice.id, replica.state)
+                    invoice.message_post(body=_("⏭ Invoice changed but its replica is already confirmed in the second database; it was not updated."))
+                    # Stored so this change is reported once, not on every capture of the invoice
+                    hashes[invoice.id] = digest
+                    unchanged |= invoice
+                else:
+                    to_update.append((invoice, replica, invoice_data, digest))
+
+        if unchanged:
+            _logger.info("⏭ %s invoice(s) unchanged since their last sync: %s", len(unchanged), unchanged.ids)
+
+        # ---- 4. Create or Update Invoices ----
+        with run.stage("create"):
+            for invoice, replica, invoice_data, digest in to_update:
+                try:
+                    with cr.savepoint():
+                        _sync_update_replica(replica, invoice_data)
+                    synced |= invoice
+                    hashes[invoice.id] = digest
+                    _logger.info("✅ Invoice %s updated in the second database: ID %s", invoice.id, replica.id)
+                except Exception as e:
+                    _logger.error("❌ Failed to update invoice %s in the second database: %s", invoice.id, str(e))
+                    errors[invoice.id] = _("Failed to update invoice in the second database: %s") % str(e)
+
+            to_create = self.browse([invoice.id for invoice in vals_by_invoice])
+            try:
+                with cr.savepoint():
+                    new_invoices = second_env["account.move"].sudo().create(list(vals_by_invoice.values()))
+                synced |= to_create
+                target_ids.update(zip(to_create.ids, new_invoices.ids))
+                _logger.info("✅ %s invoice(s) created in the second database: %s", len(new_invoices), new_invoices.ids)
+            except Exception as e:
+                _logger.warning("⚠ Batch invoice creation failed, retrying one by one: %s", str(e))
+                for invoice, invoice_data in vals_by_invoice.items():
+                    try:
+                        with cr.savepoint():
+                            new_invoice = second_env["account.move"].sudo().create(invoice_data)
+                        synced |= invoice
+                        target_ids[invoice.id] = new_invoice.id
+                        _logger.info("✅ Invoice %s created in the second database: ID %s", invoice.id, new_invoice.id)
+                    except Exception as e:
+                        _logger.error("❌ Failed to create invoice %s in the second database: %s", invoice.id, str(e))
+                        errors[invoice.id] = _("Failed to create invoice in the second database: %s") % str(e)
+
+        # ✅ Remember the replicas for later lookups (payments, re-syncs)
+        with run.stage("finalize"):
+            hashes = {key: digest for key, digest in hashes.items() if key not in errors}
+            (map_env or self.env)["pg.sync.map"].sudo()._set_targets(
+                "account.move",
+                {key: target_ids[key] for key in target_ids if key not in unchanged.ids or key in hashes},
+                self.env.cr.dbname, second_env.cr.dbname, hashes=hashes,
+            )
+        return synced
+
+    def _sync_find_replicas(self, second_env):
+        """
+        Return ``{invoice id: (replica, sync_hash)}`` for the invoices already replicated,
+        found through ``pg.sync.map`` or else the indexed ``x_original_invoice_id``.
+        """
+        TargetMove = second_env["account.move"].sudo()
+        entries = self.env["pg.sync.map"].sudo()._get_entries(
+            "account.move", self.ids, self.env.cr.dbname, second_env.cr.dbname,
+        )
+        existing = TargetMove.browse([target_id for target_id, _digest in entries.values()]).exists()
+        replicas = {
+            source_id: (TargetMove.browse(target_id), digest)
+            for source_id, (target_id, digest) in entries.items()
+            if target_id in existing.ids
+        }
+
+        missing = [move_id for move_id in self.ids if move_id not in replicas]
+        if missing and "x_original_invoice_id" in TargetMove._fields:
+            for replica in TargetMove.search([("x_original_invoice_id", "in", missing)], order="id"):
+                replicas.setdefault(replica.x_original_invoice_id, (replica, None))
+        return replicas
+
+    def _sync_invoice_vals(self, customer_id, journal_id, account_id, tax_ids):
+        """Values used to create the replica of the invoice in the second database."""
+        self.ensure_one()
+
+        # ---- Ensure Invoice Lines in Correct Order ----
+        invoice_lines = []
+        for line in self.invoice_line_ids.sorted(lambda l: l.sequence):
+            if line.display_type in ["line_section", "line_note"]:
+                invoice_lines.append((0, 0, {
+                    "display_type": line.display_type,
+                    "name": line.name,
+                    "sequence": line.sequence,
+                }))
+                continue
+
+            line_tax_ids = [tax_ids[tax.id] for tax in line.tax_ids if tax.id in tax_ids]
+
+            invoice_lines.append((0, 0, {
+                "name": line.name,
+                "quantity": line.quantity or 0.0,
+                "price_unit": line.price_unit or 0.0,
+                "discount": line.discount or 0.0,
+                "tax_ids": [(6, 0, line_tax_ids)] if line_tax_ids else [],
+                "account_id": account_id,
+                "sequence": line.sequence,
+            }))
+
+        return {
+            "partner_id": customer_id,
+            "move_type": self.move_type,
+            "invoice_date": self.invoice_date,
+            "invoice_date_due": self.invoice_date_due,
+            "payment_reference": self.payment_reference,
+            "state": "draft",
+            "invoice_line_ids": invoice_lines,
+            "journal_id": journal_id,
+        }
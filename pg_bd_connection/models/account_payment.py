@@ -1,177 +1,331 @@
 import logging
-import odoo
+from collections import defaultdict
+from contextlib import nullcontext
+
 from odoo import models, fields, api, _
 
+from .sync_cache import resolve_partners, resolve_payment_method_lines
+from .sync_log import SyncRun
+
 _logger = logging.getLogger(__name__)
 
+
+def _create_and_reconcile(second_env, vals_by_payment, invoices, run=None):
+    """
+    Create the target payments with one ``create`` call, post them together and reconcile
+    them with their invoices in one plan, grouping the lines per invoice and account.
+    Returns ``{source payment id: target payment id}``.
+    """
+    stage = run.stage if run else lambda name: nullcontext()
+    sources = list(vals_by_payment)
+    with stage("create"):
+        targets = second_env["account.payment"].sudo().create(list(vals_by_payment.values()))
+    with stage("post"):
+        targets.action_post()
+
+    groups = defaultdict(lambda: second_env["account.move.line"])  # (invoice, account) -> lines
+    for source, target in zip(sources, targets):
+        invoice = invoices[source.id]
+        _liquidity_lines, counterpart_lines, _writeoff_lines = target._seek_for_lines()
+        invoice_lines = invoice.line_ids.filtered(
+            lambda l: l.account_id.account_type in ("asset_receivable", "liability_payable") and not l.reconciled
+        )
+        for line in (counterpart_lines + invoice_lines).filtered(lambda l: not l.reconciled):
+            groups[(invoice.id, line.account_id.id)] |= line
+
+    plan = [lines for lines in groups.values() if len(lines) > 1]
+    if plan:
+        with stage("reconcile"):
+            second_env["account.move.line"]._reconcile_plan(plan)
+    _logger.info("✅ %s payment(s) registered and reconciled in %s group(s)", len(targets), len(plan))
+    return dict(zip([source.id for source in sources], targets.ids))
+
+
 class AccountPayment(models.Model):
     _inherit = "account.payment"
 
+    def action_queue_sync_payment(self):
+        """Queue the payments for synchronization by the background workers."""
+        jobs = self.env["pg.sync.job"]._enqueue(self)
+        return jobs._queued_notification()
+
+    def _sync_from_queue(self):
+        return self._sync_to_community()
+
     def action_sync_payment(self):
         """
-        Sync payment with another Odoo database by matching invoices via the ref field
-        and calling action_register_payment on the correct invoice.
+        Sync payments with another Odoo database by matching invoices via the ref field
+        and reconciling the replicated payments with those invoices.
+        """
+        errors = self._sync_to_community()
+        if len(self) == 1:
+            if errors:
+                raise ValueError(_("Failed to sync payment: %s") % errors[self.id])
+            return True
+        return self.env["pg.sync.job"]._result_notification(self, errors)
+
+    def _sync_to_community(self):
+        """
+        Works on the whole recordset: partners, target invoices and payment methods are
+        resolved for the batch, target payments are created with one ``create`` call,
+        posted together and reconciled with their invoices in a single reconciliation
+        plan grouped per invoice and account. Failures are reported per payment; returns
+        a dict payment id -> error message for the payments that failed. Every run is
+        recorded in ``pg.sync.log`` with the time and queries of each stage.
         """
-        _logger.info(" Starting payment synchronization for Payment ID: %s", self.id)
-
-        second_db = "PICCOLO_COMMUNITY"
-        fixed_journal_id = 14  # ✅ Always apply Journal ID 14 in second database
-
-        try:
-            registry = odoo.registry(second_db)
-            if not registry:
-                raise ValueError(f"❌ Registry for database {second_db} not found!")
-
-            with registry.cursor() as cr:
-                second_env = api.Environment(cr, self.env.uid, {})
-
-                #  Force access to all companies in second DB
-                companies = second_env["res.company"].sudo().search([]).ids
-                second_env = api.Environment(cr, self.env.uid, {
-                    "allowed_company_ids": companies,
-                    "force_company": companies[0],
-                })
-
-                _logger.info("✅ Successfully switched to database: %s", second_db)
-
-                # ---- 1. Ensure Customer Exists ----
-                customer = second_env["res.partner"].sudo().search(
-                    [("name", "=", self.partner_id.name)], limit=1
-                )
-
-                if not customer:
-                    _logger.info(" Customer not found. Creating new customer: %s", self.partner_id.name)
-                    customer = second_env["res.partner"].sudo().create({
-                        "name": self.partner_id.name,
-                        "email": self.partner_id.email,
-                        "phone": self.partner_id.phone,
-                        "street": self.partner_id.street,
-                        "city": self.partner_id.city,
-                        "zip": self.partner_id.zip,
-                        "country_id": self.partner_id.country_id.id if self.partner_id.country_id else False,
-                        "vat": self.partner_id.vat,
-                        "customer_rank": 1,
-                    })
-                    _logger.info("✅ New customer created: ID %s", customer.id)
-
-                # ---- 2. Find the Correct Invoice ----
-                invoice = None
-                if self.ref:
-                    _logger.info(" Searching for invoice in second database with name matching ref: %s", self.ref)
-                    invoice = second_env["account.move"].sudo().search([("name", "=", self.ref)], limit=1)
-
-                if not invoice:
-                    raise ValueError(f"❌ No matching invoice found in second database with name: {self.ref}")
-
-                # ✅ Ensure Invoice is Confirmed
-                if invoice.state != "posted":
-                    raise ValueError(f"❌ Invoice {invoice.name} is not confirmed in second database!")
-
-                # ---- 3. Prepare Payment Data ----
-                _logger.info("✅ Invoice found and confirmed. Preparing payment data...")
-
-                # Match payment method
-                payment_method_name = self.payment_method_line_id.name if self.payment_method_line_id else None
-                payment_method_line = None
-
-                if payment_method_name:
-                    _logger.info(" Searching for Payment Method in second database: %s", payment_method_name)
-                    payment_method_line = second_env["account.payment.method.line"].sudo().search(
-                        [("name", "=", payment_method_name)], limit=1
-                    )
-
-                if not payment_method_line:
-                    _logger.warning("⚠ Payment method not found in second database. Using default method.")
-                    payment_method_line = second_env["account.payment.method.line"].sudo().search([], limit=1)
-
-                if not payment_method_line:
-                    raise ValueError("❌ No available payment method found in second database!")
-
-                # ---- 4. Register Payment via `action_register_payment` ----
-                payment_vals = {
-                    "amount": self.amount,
-                    "payment_date": self.date,
-                    "journal_id": fixed_journal_id,  # ✅ Always use fixed journal 14
-                    "payment_method_line_id": payment_method_line.id,
-                    "payment_type": self.payment_type,
-                    "partner_type": self.partner_type,
-                    "partner_id": customer.id,
-                    "currency_id": self.currency_id.id,
-                }
-
-                # ✅ Call `action_register_payment` on the invoice
-                _logger.info("✅ Registering payment for invoice: %s", invoice.name)
-                payment_wizard = second_env["account.payment.register"].with_context(
-                    active_model="account.move",
-                    active_ids=invoice.ids,
-                ).create(payment_vals)
-
-                # ✅ Execute the payment
-                payment_wizard.action_create_payments()
-                _logger.info("✅ Payment successfully registered for invoice %s", invoice.name)
-
-                # ✅ Mark as Synced
-                self.sudo().write({"x_studio_community_1": True})
-                _logger.info("✅ Invoice marked as synced (x_studio_community = True)")
-
-                self.message_post(body=_("✅ Payment successfully synced."))
-                return True
-
-        except Exception as e:
-            _logger.error("❌ Failed to register payment in second database: %s", str(e))
-            raise ValueError(_("Failed to sync payment: %s") % str(e))
+        _logger.info(" Starting payment synchronization for %s payment(s): %s", len(self), self.ids)
+
+        config = self.env["pg.sync.config"]._get_config()
+        SyncMap = self.env["pg.sync.map"].sudo()
+        source_db, target_db = self.env.cr.dbname, config.target_db
+
+        with SyncRun(self.env, "account.payment", self) as run:
+            errors = run.errors  # payment id -> error message
+            synced = self.browse()
+
+            try:
+                with config._target_env(self.env.uid, run) as second_env:
+                    _logger.info("✅ Successfully switched to database: %s", config.target_db)
+
+                    # Payments already replicated are not created twice
+                    mapped = SyncMap._get_targets("account.payment", self.ids, source_db, target_db)
+                    existing = set(second_env["account.payment"].sudo().browse(list(mapped.values())).exists().ids)
+                    already_synced = [source_id for source_id, target_id in mapped.items() if target_id in existing]
+                    if already_synced:
+                        _logger.info("⏭ %s payment(s) already synced: %s", len(already_synced), already_synced)
+                    # Their target was committed, but maybe not their flag (retry after a rollback)
+                    synced = self.browse(already_synced)
+                    payments = self - synced
+
+                    # ---- 1. Ensure Customers Exist ----
+                    with run.stage("partner"):
+                        customer_ids = resolve_partners(payments.partner_id, second_env)
+
+                    # ---- 2. Find the Correct Invoices ----
+                    with run.stage("invoice"):
+                        invoices = payments._sync_find_target_invoices(second_env)
+                        for payment in payments:
+                            invoice = invoices.get(payment.id)
+                            if not invoice:
+                                errors[payment.id] = f"❌ No matching invoice found in second database with name: {payment.ref}"
+                            # ✅ Ensure Invoice is Confirmed
+                            elif invoice.state != "posted":
+                                errors[payment.id] = f"❌ Invoice {invoice.name} is not confirmed in second database!"
+
+                    # ---- 3. Prepare Payment Data ----
+                    with run.stage("lines"):
+                        payments = payments.filtered(lambda p: p.id not in errors)
+
+                        # Match payment methods, falling back to the default one
+                        payment_method_ids = resolve_payment_method_lines(payments.payment_method_line_id, second_env)
+
+                        vals_by_payment = {}
+                        for payment in payments:
+                            method_line = payment.payment_method_line_id
+                            payment_method_line_id = payment_method_ids.get(method_line.id) or payment_method_ids.get(False)
+                            if not payment_method_line_id:
+                                errors[payment.id] = "❌ No available payment method found in second database!"
+                                continue
+                            if method_line and method_line.id not in payment_method_ids:
+                                _logger.warning("⚠ Payment method %s not found in second database. Using default method.", method_line.name)
+                            vals_by_payment[payment] = {
+                                "amount": payment.amount,
+                                "date": payment.date,
+                                "ref": payment.ref,
+                                "journal_id": config.target_payment_journal_id,
+                                "payment_method_line_id": payment_method_line_id,
+                                "payment_type": payment.payment_type,
+                                "partner_type": payment.partner_type,
+                                "partner_id": customer_ids.get(payment.partner_id.id, False),
+                                "currency_id": payment.currency_id.id,
+                            }
+
+                    # ---- 4. Create, Post and Reconcile Payments ----
+                    target_ids = {}
+                    try:
+                        with second_env.cr.savepoint():
+                            target_ids = _create_and_reconcile(second_env, vals_by_payment, invoices, run)
+                        synced |= self.browse([payment.id for payment in vals_by_payment])
+                    except Exception as e:
+                        _logger.warning("⚠ Batch payment creation failed, retrying one by one: %s", str(e))
+                        for payment, payment_vals in vals_by_payment.items():
+                            try:
+                                with second_env.cr.savepoint():
+                                    target_ids.update(_create_and_reconcile(second_env, {payment: payment_vals}, invoices, run))
+                                synced |= payment
+                            except Exception as e:
+                                _logger.error("❌ Failed to register payment %s in second database: %s", payment.id, str(e))
+                                errors[payment.id] = str(e)
+
+                    # Committed first and on its own: without it a retry would pay the invoice twice
+                    with run.stage("finalize"):
+                        SyncMap._commit_targets("account.payment", target_ids, source_db, target_db)
+                    with run.stage("commit"):
+                        second_env.cr.commit()
+
+            except Exception as e:
+                _logger.error("❌ Failed to register payments in second database: %s", str(e))
+                raise ValueError(_("Failed to sync payment: %s") % str(e))
+
+            # ✅ Mark as Synced
+            with run.stage("finalize"):
+                to_flag = synced.filtered(lambda p: not p.x_studio_community_1)
+                if to_flag:
+                    to_flag.sudo().write({"x_studio_community_1": True})
+                    _logger.info("✅ %s payment(s) marked as synced (x_studio_community_1 = True)", len(to_flag))
+                    for payment in to_flag:
+                        payment.message_post(body=_("✅ Payment successfully synced."))
+
+                for payment in self.filtered(lambda p: p.id in errors):
+                    payment.message_post(body=_("❌ Payment sync failed: %s") % errors[payment.id])
+
+        return errors
+
+    def _sync_find_target_invoices(self, second_env):
+        """
+        Find the replicas of the paid invoices in the second database, returning
+        ``{payment id: target invoice}``. The source invoices are matched by ``ref`` and
+        their replicas found through ``pg.sync.map`` or the indexed ``x_original_invoice_id``;
+        the name match is kept for invoices synced before both existed.
+        """
+        TargetMove = second_env["account.move"].sudo()
+        SyncMap = self.env["pg.sync.map"].sudo()
+        source_db, target_db = self.env.cr.dbname, second_env.cr.dbname
+        refs = list(set(self.filtered("ref").mapped("ref")))
+        if not refs:
+            return {}
+
+        source_by_name = {}
+        for source_invoice in self.env["account.move"].search([("name", "in", refs)]):
+            source_by_name.setdefault(source_invoice.name, source_invoice.id)
+
+        target_by_source = SyncMap._get_targets("account.move", list(source_by_name.values()), source_db, target_db)
+        existing = set(TargetMove.browse(list(target_by_source.values())).exists().ids)
+        target_by_source = {key: value for key, value in target_by_source.items() if value in existing}
+
+        missing = [source_id for source_id in source_by_name.values() if source_id not in target_by_source]
+        if missing and "x_original_invoice_id" in TargetMove._fields:
+            found = {}
+            for replica in TargetMove.search([("x_original_invoice_id", "in", missing)], order="id"):
+                found.setdefault(replica.x_original_invoice_id, replica.id)
+            SyncMap._set_targets("account.move", found, source_db, target_db)
+            target_by_source.update(found)
+
+        target_by_name = {name: target_by_source[source_id] for name, source_id in source_by_name.items() if source_id in target_by_source}
+        unmatched = [name for name in refs if name not in target_by_name]
+        if unmatched:
+            _logger.info(" Searching for invoices in second database with name matching ref: %s", unmatched)
+            for replica in TargetMove.search([("name", "in", unmatched)]):
+                target_by_name.setdefault(replica.name, replica.id)
+
+        return {
+            payment.id: TargetMove.browse(target_by_name[payment.ref])
+            for payment in self if payment.ref in target_by_name
+        }
 
     def mark_as_sent(self):
         """Marks payment as sent and reconciles it with the invoice if possible, else marks the invoice as paid."""
-        for payment in self:
-            _logger.info(f"Processing payment: {payment.name} (State: {payment.state})")
+        report = self._mark_as_sent_batch()
+        counts = defaultdict(int)
+        for status, _message in report.values():
+            counts[status] += 1
+        _logger.info(f"mark_as_sent processed {len(report)} payment(s): {dict(counts)}")
 
+    def _mark_as_sent_batch(self):
+        """
+        Batch version of ``mark_as_sent``: the invoices of all payments are fetched with one
+        ``name IN (...)`` query, the reconcilable lines are grouped per invoice, account and
+        partner, and every group is reconciled in a single ``_reconcile_plan`` call.
+        ``is_move_sent`` is then written in one statement.
+
+        Returns ``{payment id: (status, message)}`` with status ``skipped``, ``no_invoice``,
+        ``paid``, ``reconciled``, ``sent`` or ``failed``.
+        """
+        report = {}
+        candidates = self.browse()
+        for payment in self:
             # Ensure payment is in the correct state
             if payment.state != 'posted':
-                _logger.warning(f"Skipping payment {payment.name}: Not posted.")
-                continue
-            if payment.is_move_sent:
-                _logger.warning(f"Skipping payment {payment.name}: Already marked as sent.")
-                continue
-            if payment.payment_method_code != 'manual':
-                _logger.warning(f"Skipping payment {payment.name}: Payment method is not 'manual'.")
+                report[payment.id] = ('skipped', "Not posted.")
+            elif payment.is_move_sent:
+                report[payment.id] = ('skipped', "Already marked as sent.")
+            elif payment.payment_method_code != 'manual':
+                report[payment.id] = ('skipped', "Payment method is not 'manual'.")
+            else:
+                candidates |= payment
                 continue
-
-            # Find the invoice using the ref field
-            invoice = self.env['account.move'].search([
-                ('name', '=', payment.ref),
+            _logger.warning(f"Skipping payment {payment.name}: {report[payment.id][1]}")
+
+        # Find the invoices using the ref field, all at once
+        refs = list(set(candidates.filtered('ref').mapped('ref')))
+        invoice_by_name = {}
+        if refs:
+            for invoice in self.env['account.move'].search([
+                ('name', 'in', refs),
                 ('state', '=', 'posted'),
                 ('move_type', 'in', ['out_invoice', 'in_invoice'])
-            ], limit=1)
+            ]):
+                invoice_by_name.setdefault(invoice.name, invoice)
+
+        def is_reconcilable(line):
+            return line.account_id.reconcile and not line.reconciled
 
+        to_mark_paid = self.env['account.move']
+        groups = defaultdict(lambda: self.env['account.move.line'])  # (invoice, account, partner) -> lines
+        payments_by_group = defaultdict(lambda: self.browse())
+        for payment in candidates:
+            invoice = invoice_by_name.get(payment.ref)
             if not invoice:
                 _logger.warning(f"Payment {payment.name}: No matching invoice found for ref '{payment.ref}'.")
+                report[payment.id] = ('no_invoice', f"No matching invoice found for ref '{payment.ref}'.")
                 continue
-            
-            _logger.info(f"Found invoice: {invoice.name} (State: {invoice.state}, Payment State: {invoice.payment_state})")
-
-            # Get reconciliable move lines
-            payment_move_lines = payment.move_id.line_ids.filtered(lambda l: l.account_id.reconcile and not l.reconciled)
-            invoice_move_lines = invoice.line_ids.filtered(lambda l: l.account_id.reconcile and not l.reconciled)
 
-            _logger.info(f"Payment move lines count: {len(payment_move_lines)}")
-            _logger.info(f"Invoice move lines count: {len(invoice_move_lines)}")
+            payment_move_lines = payment.move_id.line_ids.filtered(is_reconcilable)
+            invoice_move_lines = invoice.line_ids.filtered(is_reconcilable)
 
             if not invoice_move_lines:
                 _logger.warning(f"No valid invoice move lines found for invoice {invoice.name}. Marking as paid manually.")
-
-                # Forcefully mark the invoice as paid
-                invoice.payment_state = 'paid'
-                _logger.info(f"Invoice {invoice.name} manually marked as paid.")
-
+                to_mark_paid |= invoice
+                report[payment.id] = ('paid', f"Invoice {invoice.name} marked as paid.")
             elif payment_move_lines:
-                try:
-                    _logger.info(f"Attempting to reconcile payment {payment.name} with invoice {invoice.name}...")
-                    (invoice_move_lines + payment_move_lines).reconcile()
-                    _logger.info(f"Reconciliation successful for payment {payment.name} and invoice {invoice.name}.")
-                except Exception as e:
-                    _logger.error(f"Reconciliation failed for payment {payment.name} - Invoice {invoice.name}: {str(e)}")
-
-            # Mark the payment as sent
-            payment.is_move_sent = True
-            _logger.info(f"Payment {payment.name} marked as sent.")
+                for line in invoice_move_lines + payment_move_lines:
+                    key = (invoice.id, line.account_id.id, line.partner_id.id)
+                    groups[key] |= line
+                    if line in payment_move_lines:
+                        payments_by_group[key] |= payment
+                report[payment.id] = ('reconciled', f"Reconciled with invoice {invoice.name}.")
+            else:
+                report[payment.id] = ('sent', f"Nothing to reconcile with invoice {invoice.name}.")
+
+        # Forcefully mark the invoices without reconcilable lines as paid
+        if to_mark_paid:
+            to_mark_paid.payment_state = 'paid'
+            _logger.info(f"{len(to_mark_paid)} invoice(s) manually marked as paid: {to_mark_paid.mapped('name')}")
+
+        # Groups holding a single line have nothing to match against
+        plan = {key: lines for key, lines in groups.items() if len(lines) > 1}
+        planned_payments = self.browse().union(*(payments_by_group[key] for key in plan))
+        for payment in candidates.filtered(lambda p: report[p.id][0] == 'reconciled') - planned_payments:
+            report[payment.id] = ('sent', "No invoice line on the same account and partner to reconcile with.")
+        if plan:
+            try:
+                with self.env.cr.savepoint():
+                    self.env['account.move.line']._reconcile_plan(list(plan.values()))
+                _logger.info(f"Reconciled {len(plan)} group(s) in one batch.")
+            except Exception as e:
+                _logger.warning(f"Batch reconciliation failed, retrying group by group: {str(e)}")
+                for key, lines in plan.items():
+                    try:
+                        with self.env.cr.savepoint():
+                            lines.reconcile()
+                    except Exception as e:
+                        _logger.error(f"Reconciliation failed for invoice {key[0]} on account {key[1]}: {str(e)}")
+                        for payment in payments_by_group[key]:
+                            report[payment.id] = ('failed', f"Reconciliation failed: {str(e)}")
+
+        # Mark the payments as sent
+        sent = candidates.filtered(lambda p: report[p.id][0] in ('paid', 'reconciled', 'sent', 'failed'))
+        if sent:
+            sent.write({'is_move_sent': True})
+            _logger.info(f"{len(sent)} payment(s) marked as sent.")
+        return report
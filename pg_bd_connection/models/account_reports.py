@@ -1,37 +1,154 @@
 from odoo import models, _
 from odoo.exceptions import UserError
+from odoo.tools.pdf import PdfFileReader, PdfFileWriter
 import logging
+import os
+import tempfile
+import time
+
+import markupsafe
 
 _logger = logging.getLogger(__name__)
 
+# Lines rendered per wkhtmltopdf call by the chunked partner ledger export (0 disables it)
+PDF_CHUNK_PARAM = 'pg_bd_connection.partner_ledger_pdf_chunk_size'
+PDF_CHUNK_SIZE = 2000
+
+
+class AccountReport(models.Model):
+    _inherit = "account.report"
+
+    def export_to_pdf(self, options):
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(PDF_CHUNK_PARAM, PDF_CHUNK_SIZE))
+        # Reports printed with their sections keep the upstream export
+        if chunk_size <= 0 or options.get('sections') or self._get_custom_handler_model() != 'account.partner.ledger.report.handler':
+            return super().export_to_pdf(options)
+        return self._export_to_pdf_chunked(options, chunk_size)
+
+    def _export_to_pdf_chunked(self, options, chunk_size):
+        """
+        Partner ledger PDF export that renders the ledger body ``chunk_size`` lines at a
+        time. The report lines are computed once; each chunk of them is turned into HTML and
+        run through wkhtmltopdf on its own, written to a temporary file and the files are
+        merged at the end, so the HTML of the whole ledger and the partial PDFs are never
+        held in memory together. The merged PDF is returned as a whole.
+        The footer numbers the pages across chunks; the page total is not shown, as it is
+        only known once the last chunk is rendered.
+        """
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        base_url = ICP.get_param('report.url') or ICP.get_param('web.base.url')
+        rcontext = {'mode': 'print', 'base_url': base_url, 'company': self.env.company}
+        print_options = self.get_options(previous_options={**options, 'export_mode': 'print'})
+        lines = self._filter_out_folded_children(self._get_lines(print_options))
+
+        action_report = self.env['ir.actions.report'].with_context(commit_assetsbundle=True)
+        landscape = len(print_options['columns']) > 5 or print_options.get('horizontal_split') or self._context.get('force_landscape_printing')
+
+        with tempfile.TemporaryDirectory(prefix='partner_ledger_') as tmp_dir:
+            paths = []
+            page_offset = 0
+            for start in range(0, max(len(lines), 1), chunk_size):
+                body = self._get_pdf_export_html(print_options, lines[start:start + chunk_size], additional_context={'base_url': base_url})
+                footer = action_report._render_template("pg_bd_connection.partner_ledger_pdf_footer", values=dict(rcontext, page_offset=page_offset))
+                footer = action_report._render_template("web.minimal_layout", values=dict(rcontext, body=markupsafe.Markup(footer.decode())))
+                path = os.path.join(tmp_dir, f'chunk_{len(paths):05d}.pdf')
+                with open(path, 'wb') as chunk_file:
+                    chunk_file.write(action_report._run_wkhtmltopdf(
+                        [body],
+                        footer=footer.decode(),
+                        landscape=landscape,
+                        specific_paperformat_args={
+                            'data-report-margin-top': 10,
+                            'data-report-header-spacing': 10,
+                            'data-report-margin-bottom': 15,
+                        },
+                    ))
+                with open(path, 'rb') as chunk_file:
+                    page_offset += PdfFileReader(chunk_file, strict=False).getNumPages()
+                paths.append(path)
+                del body
+            _logger.info("📄 Partner ledger PDF rendered in %s chunk(s) of up to %s lines (%s lines, %s pages)", len(paths), chunk_size, len(lines), page_offset)
+            del lines
+
+            # Pages are read lazily from the chunk files while the merged file is written
+            writer = PdfFileWriter()
+            chunk_files = [open(path, 'rb') for path in paths]
+            try:
+                for chunk_file in chunk_files:
+                    reader = PdfFileReader(chunk_file, strict=False)
+                    for page in range(reader.getNumPages()):
+                        writer.addPage(reader.getPage(page))
+                merged_path = os.path.join(tmp_dir, 'merged.pdf')
+                with open(merged_path, 'wb') as merged_file:
+                    writer.write(merged_file)
+            finally:
+                for chunk_file in chunk_files:
+                    chunk_file.close()
+            with open(merged_path, 'rb') as merged_file:
+                file_content = merged_file.read()
+
+        return {
+            'file_name': self.get_default_report_filename(print_options, 'pdf'),
+            'file_content': file_content,
+            'file_type': 'pdf',
+        }
+
+
 class CustomPartnerLedgerReport(models.AbstractModel):
     _inherit = "account.partner.ledger.report.handler"
 
+    def _get_move_line_render_context(self, options):
+        """
+        Column dispatch and empty column used to build the move lines of ``options``. They
+        are built once per render (the same ``options`` dict is passed for every line) and
+        kept in the cursor cache, released with the cursor.
+        """
+        key = ('pg_bd_connection.partner_ledger', id(options))
+        memo = self.env.cr.cache.get(key)
+        if memo and memo['options'] is options:
+            return memo
+
+        report = self.env['account.report'].browse(options['report_id'])
+        memo = self.env.cr.cache[key] = {
+            'options': options,
+            'company_currency_id': self.env.company.currency_id.id,
+            'columns': [(column, column['expression_label'], column['column_group_key']) for column in options['columns']],
+            'labels_checked': False,
+            'empty_column': report._build_column_dict(None, None),
+        }
+        return memo
+
     def _get_report_line_move_line(self, options, aml_query_result, partner_line_id, init_bal_by_col_group, level_shift=0):
         if aml_query_result['payment_id']:
             caret_type = 'account.payment'
         else:
             caret_type = 'account.move.line'
 
-        columns = []
+        memo = self._get_move_line_render_context(options)
         report = self.env['account.report'].browse(options['report_id'])
+        if not memo['labels_checked']:
+            # Every line of the query has the same keys
+            for _column, col_expr_label, _group_key in memo['columns']:
+                if col_expr_label not in aml_query_result:
+                    raise UserError(_("The column '%s' is not available for this report." % col_expr_label))
+            memo['labels_checked'] = True
 
-        for column in options['columns']:
-            col_expr_label = column['expression_label']
-            if col_expr_label not in aml_query_result:
-                raise UserError(_("The column '%s' is not available for this report." % col_expr_label))
-
-            col_value = aml_query_result[col_expr_label] if column['column_group_key'] == aml_query_result['column_group_key'] else None
+        columns = []
+        line_group_key = aml_query_result['column_group_key']
+        for column, col_expr_label, column_group_key in memo['columns']:
+            col_value = aml_query_result[col_expr_label] if column_group_key == line_group_key else None
 
             if col_value is None:
-                columns.append(report._build_column_dict(None, None))
+                columns.append(dict(memo['empty_column']))
             else:
                 currency = False
                 if col_expr_label == 'balance':
-                    col_value += init_bal_by_col_group[column['column_group_key']]
+                    col_value += init_bal_by_col_group[column_group_key]
                 if col_expr_label == 'amount_currency':
-                    currency = self.env['res.currency'].browse(aml_query_result['currency_id'])
-                    if currency == self.env.company.currency_id:
+                    currency_id = aml_query_result['currency_id']
+                    currency = self.env['res.currency'].browse(currency_id)
+                    if currency_id == memo['company_currency_id']:
                         col_value = ''
                 columns.append(report._build_column_dict(col_value, column, options=options, currency=currency))
 
@@ -54,32 +171,62 @@ class CustomPartnerLedgerReport(models.AbstractModel):
         return info
 
 
+def _clean_name(name, cache, separators):
+    """First part of ``name`` before any of ``separators``, computed once per distinct name."""
+    cleaned = cache.get(name)
+    if cleaned is None:
+        cleaned = name
+        for separator in separators:
+            cleaned = cleaned.partition(separator)[0]
+        cache[name] = cleaned
+    return cleaned
+
+
 class CustomAgedReceivableReport(models.AbstractModel):
     _inherit = "account.aged.receivable.report.handler"
 
+    def _get_name_cache(self, options):
+        """
+        Cleaned partner names of the render of ``options``, shared by the engine and the line
+        postprocessor. Kept in the cursor cache, released with the cursor.
+        """
+        key = ('pg_bd_connection.aged_receivable', id(options))
+        memo = self.env.cr.cache.get(key)
+        if not memo or memo['options'] is not options:
+            memo = self.env.cr.cache[key] = {'options': options, 'engine': {}, 'lines': {}}
+        return memo
+
     def _report_custom_engine_aged_receivable(self, expressions, options, date_scope, current_groupby, next_groupby, offset=0, limit=None, warnings=None):
-        _logger.info("⏳ Calling _report_custom_engine_aged_receivable")
-        results = super()._report_custom_engine_aged_receivable(expressions, options, date_scope, current_groupby, next_groupby, offset, limit, warnings)
-        _logger.info("📌 Original Results Before Modification: %s", results)
-
-        for idx, record in enumerate(results):
-            if isinstance(record, tuple):
-                record_data = record[1]
-                if 'name' in record_data:
-                    record_data['name'] = record_data['name'].split("\n")[0].split(" / ")[0]
-            elif isinstance(record, dict):
-                if 'name' in record:
-                    record['name'] = record['name'].split("\n")[0].split(" / ")[0]
+        started = time.perf_counter()
+        results = self.env['pg.aged.receivable.snapshot']._get_aged_results(options, current_groupby, offset, limit)
+        source = 'snapshot'
+        if results is None:
+            results = super()._report_custom_engine_aged_receivable(expressions, options, date_scope, current_groupby, next_groupby, offset, limit, warnings)
+            source = 'live'
+        computed = time.perf_counter()
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("📌 Original Results Before Modification: %s", results)
+
+        names = self._get_name_cache(options)['engine']
+        for record in results:
+            record_data = record[1] if isinstance(record, tuple) else record
+            if isinstance(record_data, dict) and record_data.get('name'):
+                record_data['name'] = _clean_name(record_data['name'], names, ("\n", " / "))
+
+        _logger.info(
+            "⏱ Aged receivable engine (groupby %s, %s): %s result(s), computed in %.0f ms, names cleaned in %.0f ms",
+            current_groupby, source, len(results), (computed - started) * 1000, (time.perf_counter() - computed) * 1000,
+        )
         return results
 
     def _custom_line_postprocessor(self, report, options, lines, warnings=None):
-        _logger.info("⏳ Entering _custom_line_postprocessor")
+        started = time.perf_counter()
+        names = self._get_name_cache(options)['lines']
         for line in lines:
             if isinstance(line, dict) and 'name' in line:
-                original_name = line['name']
-                cleaned_name = original_name.split("\n")[0].split(" (")[0].split(" / ")[0]
-                line['name'] = cleaned_name
+                line['name'] = _clean_name(line['name'], names, ("\n", " (", " / "))
                 if line.get("level") == 2:
                     line.setdefault('class', '')
                     line['class'] += ' partner-header partner-header-pdf'
+        _logger.info("⏱ Aged receivable postprocessor: %s line(s) in %.0f ms", len(lines), (time.perf_counter() - started) * 1000)
         return lines
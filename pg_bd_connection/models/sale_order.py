@@ -1,4 +1,12 @@
+import logging
+
 from odoo import models, fields, api
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+# Length of the stored summary of the order line descriptions
+ORDER_LINE_SUMMARY_SIZE = 250
 
 class SaleOrder(models.Model):
     _inherit = "sale.order"
@@ -9,14 +17,71 @@ class SaleOrder(models.Model):
         store=False,
         search="_search_order_line_description"
     )
+    order_line_summary = fields.Char(
+        string="Resumo do Produto",
+        compute="_compute_order_line_summary",
+        store=True,
+        index='trigram',
+        help="Order line descriptions truncated to %s characters, stored for list views and searches." % ORDER_LINE_SUMMARY_SIZE,
+    )
 
     def _compute_order_line_description(self):
-        """Concatenates all order line names into a single field"""
+        """Concatenates all order line names into a single field, with one grouped query for all orders"""
+        descriptions = self._get_order_line_descriptions()
+        for order in self:
+            if order.id in descriptions:
+                order.order_line_description = descriptions[order.id]
+            else:
+                # Orders being edited are not in the database yet
+                order.order_line_description = ", ".join(order.order_line.filtered('name').mapped("name"))
+
+    @api.depends('order_line.name', 'order_line.sequence')
+    def _compute_order_line_summary(self):
         for order in self:
-            order.order_line_description = ", ".join(order.order_line.mapped("name"))
+            description = ", ".join(order.order_line.sorted(lambda l: (l.sequence, l.id)).filtered('name').mapped("name"))
+            if len(description) > ORDER_LINE_SUMMARY_SIZE:
+                description = description[:ORDER_LINE_SUMMARY_SIZE - 1] + "…"
+            order.order_line_summary = description
+
+    def _get_order_line_descriptions(self):
+        """Return ``{order id: line names joined in sequence order}`` for the saved orders of ``self``."""
+        order_ids = [order_id for order_id in self.ids if isinstance(order_id, int)]
+        if not order_ids:
+            return {}
+        self.env['sale.order.line'].flush_model(['order_id', 'name', 'sequence'])
+        self.env.cr.execute("""
+            SELECT order_id, string_agg(name, ', ' ORDER BY sequence, id)
+              FROM sale_order_line
+             WHERE order_id = ANY(%s)
+          GROUP BY order_id
+        """, [order_ids])
+        descriptions = dict.fromkeys(order_ids, "")
+        descriptions.update({order_id: description or "" for order_id, description in self.env.cr.fetchall()})
+        return descriptions
 
     def _search_order_line_description(self, operator, value):
-        """Searches for sale orders containing a description in their sale order lines"""
-        orders = self.env['sale.order.line'].search([('name', 'ilike', value)]).mapped('order_id')
-        return [('id', 'in', orders.ids)]
+        """
+        Searches for sale orders containing a description in their sale order lines.
+        The lines are matched in an EXISTS subquery served by the trigram index on their name.
+        """
+        if operator in expression.NEGATIVE_TERM_OPERATORS:
+            positive_operator = expression.TERM_OPERATORS_NEGATION[operator]
+            return [('order_line', 'not any', [('name', positive_operator, value)])]
+        return [('order_line', 'any', [('name', operator, value)])]
+
+
+class SaleOrderLine(models.Model):
+    _inherit = "sale.order.line"
+
+    # Trigram index (pg_trgm) for the ilike searches on the order description
+    name = fields.Text(index='trigram')
 
+    def init(self):
+        super().init()
+        # Without pg_trgm the ORM falls back to a btree index, which ilike searches cannot use
+        if not self.env.registry.has_trigram:
+            _logger.warning(
+                "⚠ PostgreSQL extension pg_trgm is not installed in %s: the order description searches "
+                "will scan sale_order_line. Run CREATE EXTENSION pg_trgm and upgrade the module.",
+                self.env.cr.dbname,
+            )
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+
+from odoo import models
+
+_logger = logging.getLogger(__name__)
+
+CACHE_TTL = 600  # seconds
+
+
+class SyncMappingCache:
+    """
+    Process-wide cache mapping source record ids to target record ids.
+
+    Entries are keyed by ``(source_db, target_db, model, source_key)`` and expire
+    after ``ttl`` seconds. Models of the target database drop their entries when
+    the mapped records are renamed or deleted (see the overrides below), but only in
+    the worker making the change and when this module is installed there, so the
+    cached ids are also checked to still exist whenever they are used.
+    """
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._entries = {}  # (source_db, target_db, model, key) -> (target_id, expiry)
+
+    def get_many(self, source_db, target_db, model, keys):
+        """Return ``{key: target_id}`` for the keys that are cached and still valid."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((source_db, target_db, model, key))
+                if entry and entry[1] > now:
+                    found[key] = entry[0]
+        return found
+
+    def set_many(self, source_db, target_db, model, mapping):
+        expiry = time.monotonic() + self.ttl
+        with self._lock:
+            for key, target_id in mapping.items():
+                self._entries[(source_db, target_db, model, key)] = (target_id, expiry)
+
+    def invalidate(self, target_db, model, target_ids=None):
+        """Drop the entries pointing to ``target_ids`` (or to any record of ``model``) in ``target_db``."""
+        target_ids = set(target_ids) if target_ids is not None else None
+        with self._lock:
+            stale = [
+                cache_key for cache_key, (target_id, _expiry) in self._entries.items()
+                if cache_key[1] == target_db and cache_key[2] == model
+                and (target_ids is None or target_id in target_ids)
+            ]
+            for cache_key in stale:
+                del self._entries[cache_key]
+        if stale:
+            _logger.debug("Invalidated %s cached %s mapping(s) in %s", len(stale), model, target_db)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(self, source_env, target_env, model, keys, fetch, persist=False):
+        """
+        Map ``keys`` to target ids, calling ``fetch(missing_keys)`` at most once for the
+        keys that are not cached. ``fetch`` returns ``(found, created)`` dicts: found ids
+        are cached right away, created ids only once the target transaction commits.
+
+        With ``persist``, keys are source record ids: misses are first looked up in the
+        ``pg.sync.map`` table and whatever ``fetch`` resolves is written back to it.
+        """
+        source_db, target_db = source_env.cr.dbname, target_env.cr.dbname
+        keys = list(dict.fromkeys(keys))
+        result = self.get_many(source_db, target_db, model, keys)
+        if result:
+            # Targets deleted by another worker or outside this module are still cached there
+            existing = set(target_env[model].sudo().browse(list(set(result.values()))).exists().ids)
+            stale = [target_id for target_id in result.values() if target_id not in existing]
+            if stale:
+                self.invalidate(target_db, model, stale)
+                result = {key: target_id for key, target_id in result.items() if target_id in existing}
+        missing = [key for key in keys if key not in result]
+
+        if missing and persist:
+            SyncMap = source_env["pg.sync.map"].sudo()
+            mapped = SyncMap._get_targets(model, missing, source_db, target_db)
+            # Drop mappings whose target record was deleted meanwhile
+            existing = set(target_env[model].sudo().browse(list(set(mapped.values()))).exists().ids)
+            mapped = {key: target_id for key, target_id in mapped.items() if target_id in existing}
+            self.set_many(source_db, target_db, model, mapped)
+            result.update(mapped)
+            missing = [key for key in missing if key not in mapped]
+
+        if missing:
+            found, created = fetch(missing)
+            self.set_many(source_db, target_db, model, found)
+            if created:
+                target_env.cr.postcommit.add(
+                    lambda: self.set_many(source_db, target_db, model, created)
+                )
+            if persist:
+                source_env["pg.sync.map"].sudo()._set_targets(model, {**found, **created}, source_db, target_db)
+            result.update(found)
+            result.update(created)
+        return result
+
+
+sync_cache = SyncMappingCache()
+
+
+def partner_sync_vals(partner):
+    """Values used to replicate a partner in the second database."""
+    return {
+        "name": partner.name,
+        "email": partner.email,
+        "phone": partner.phone,
+        "street": partner.street,
+        "city": partner.city,
+        "zip": partner.zip,
+        "country_id": partner.country_id.id if partner.country_id else False,
+        "vat": partner.vat,
+        "customer_rank": 1,
+    }
+
+
+def resolve_partners(partners, target_env):
+    """
+    Map ``partners`` to partners of the target database, creating the missing ones in a
+    single batch. Partners never synced before are matched by name. Returns a dict
+    source partner id -> target partner id.
+    """
+    def fetch(partner_ids):
+        missing_partners = partners.browse(partner_ids)
+        Partner = target_env["res.partner"].sudo()
+        target_by_name = {}
+        for target in Partner.search([("name", "in", list(set(missing_partners.mapped("name"))))]):
+            target_by_name.setdefault(target.name, target.id)
+        found = {p.id: target_by_name[p.name] for p in missing_partners if p.name in target_by_name}
+
+        created = {}
+        to_create = missing_partners.filtered(lambda p: p.name not in target_by_name)
+        if to_create:
+            _logger.info("🔄 Creating %s missing customer(s): %s", len(to_create), to_create.mapped("name"))
+            # Partners sharing a name in the source database are created only once
+            by_name = {partner.name: partner for partner in to_create}
+            for target in Partner.create([partner_sync_vals(p) for p in by_name.values()]):
+                target_by_name[target.name] = target.id
+            created = {p.id: target_by_name[p.name] for p in to_create}
+        return found, created
+
+    return sync_cache.resolve(partners.env, target_env, "res.partner", partners.ids, fetch, persist=True)
+
+
+def resolve_taxes(taxes, target_env):
+    """Map ``taxes`` to taxes of the target database with the same name. Unmatched taxes are left out."""
+    def fetch(tax_ids):
+        missing_taxes = taxes.browse(tax_ids)
+        target_by_name = {}
+        for tax in target_env["account.tax"].sudo().search([("name", "in", list(set(missing_taxes.mapped("name"))))]):
+            target_by_name.setdefault(tax.name, tax.id)
+        return {t.id: target_by_name[t.name] for t in missing_taxes if t.name in target_by_name}, {}
+
+    return sync_cache.resolve(taxes.env, target_env, "account.tax", taxes.ids, fetch, persist=True)
+
+
+def resolve_sale_journal(source_env, target_env, configured_journal_id=None):
+    """
+    Return ``(journal_id, default_account_id)`` of the configured sales journal of the
+    target database, or of its first sales journal when none is configured.
+    """
+    key = configured_journal_id or "sale"
+
+    def fetch_journal(keys):
+        domain = [("id", "=", configured_journal_id)] if configured_journal_id else [("type", "=", "sale")]
+        journal = target_env["account.journal"].sudo().search(domain, limit=1)
+        return ({key: journal.id} if journal else {}), {}
+
+    journal_id = sync_cache.resolve(source_env, target_env, "account.journal", [key], fetch_journal).get(key)
+    if not journal_id:
+        raise ValueError("❌ No sales journal found in second database!")
+
+    def fetch_account(keys):
+        journal = target_env["account.journal"].sudo().browse(journal_id)
+        return ({journal_id: journal.default_account_id.id} if journal.default_account_id else {}), {}
+
+    account_id = sync_cache.resolve(source_env, target_env, "account.account", [journal_id], fetch_account).get(journal_id)
+    if not account_id:
+        journal = target_env["account.journal"].sudo().browse(journal_id)
+        raise ValueError(f"❌ Journal {journal.name} does not have a default account assigned!")
+    return journal_id, account_id
+
+
+def resolve_payment_method_lines(method_lines, target_env):
+    """
+    Map payment method lines to lines of the target database with the same name; the
+    ``False`` key maps to the default line used when no match is found.
+    """
+    def fetch(keys):
+        MethodLine = target_env["account.payment.method.line"].sudo()
+        names = list(set(method_lines.browse([k for k in keys if k]).mapped("name")))
+        target_by_name = {}
+        if names:
+            for line in MethodLine.search([("name", "in", names)]):
+                target_by_name.setdefault(line.name, line.id)
+        found = {}
+        for key in keys:
+            if key:
+                name = method_lines.browse(key).name
+                if name in target_by_name:
+                    found[key] = target_by_name[name]
+            else:
+                default = MethodLine.search([], limit=1)
+                if default:
+                    found[key] = default.id
+        return found, {}
+
+    return sync_cache.resolve(method_lines.env, target_env, "account.payment.method.line", method_lines.ids + [False], fetch)
+
+
+class SyncCacheInvalidationMixin(models.AbstractModel):
+    _name = "pg.sync.cache.invalidation.mixin"
+    _description = "Invalidate cached sync mappings when target records change"
+
+    _sync_cache_fields = {"name"}
+
+    def write(self, vals):
+        if self._sync_cache_fields.intersection(vals):
+            sync_cache.invalidate(self.env.cr.dbname, self._name, self.ids)
+        return super().write(vals)
+
+    def unlink(self):
+        sync_cache.invalidate(self.env.cr.dbname, self._name, self.ids)
+        return super().unlink()
+
+
+class ResPartner(models.Model):
+    _name = "res.partner"
+    _inherit = ["res.partner", "pg.sync.cache.invalidation.mixin"]
+
+
+class AccountTax(models.Model):
+    _name = "account.tax"
+    _inherit = ["account.tax", "pg.sync.cache.invalidation.mixin"]
+
+
+class AccountJournal(models.Model):
+    _name = "account.journal"
+    _inherit = ["account.journal", "pg.sync.cache.invalidation.mixin"]
+
+    _sync_cache_fields = {"name", "type", "default_account_id", "active"}
+
+    def write(self, vals):
+        if "default_account_id" in vals:
+            sync_cache.invalidate(self.env.cr.dbname, "account.account")
+        return super().write(vals)
+
+
+class AccountAccount(models.Model):
+    _name = "account.account"
+    _inherit = ["account.account", "pg.sync.cache.invalidation.mixin"]
+
+    _sync_cache_fields = {"deprecated", "active"}
+
+
+class AccountPaymentMethodLine(models.Model):
+    _name = "account.payment.method.line"
+    _inherit = ["account.payment.method.line", "pg.sync.cache.invalidation.mixin"]
@@ -0,0 +1,206 @@
+import logging
+import time
+from itertools import groupby
+
+import odoo
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+from odoo.tools.sql import column_exists
+
+from .account_move import CDC_MOVE_TYPES
+
+_logger = logging.getLogger(__name__)
+
+CHECK_CHUNK_SIZE = 2000  # rows fetched per round trip from each server-side cursor
+CHECK_FLUSH_SIZE = 1000  # discrepancies buffered before they are written
+
+# Replicated invoices with their product line aggregates, in source id order
+SOURCE_QUERY = """
+    SELECT m.id, m.name, m.amount_untaxed, m.amount_total, l.line_count
+      FROM account_move m
+ LEFT JOIN LATERAL (
+           SELECT count(*) AS line_count FROM account_move_line
+            WHERE move_id = m.id AND display_type = 'product'
+           ) l ON TRUE
+     WHERE m.x_studio_community AND m.move_type IN %s
+  ORDER BY m.id
+"""
+TARGET_QUERY = """
+    SELECT m.x_original_invoice_id, m.id, m.name, m.amount_untaxed, m.amount_total, l.line_count
+      FROM account_move m
+ LEFT JOIN LATERAL (
+           SELECT count(*) AS line_count FROM account_move_line
+            WHERE move_id = m.id AND display_type = 'product'
+           ) l ON TRUE
+     WHERE m.x_original_invoice_id IS NOT NULL
+  ORDER BY m.x_original_invoice_id, m.id
+"""
+
+
+def _stream(cr, name, query, params=None):
+    """Iterate over the rows of ``query`` through a server-side cursor, one chunk at a time."""
+    with cr._cnx.cursor(name) as server_cursor:
+        server_cursor.itersize = CHECK_CHUNK_SIZE
+        server_cursor.execute(query, params)
+        yield from server_cursor
+
+
+def _merge(sources, targets):
+    """
+    Merge join of the source rows with the target rows grouped by original invoice id,
+    both sorted by that id. Yields ``(source_row, target_rows)``; either side may be
+    missing (``None`` / ``[]``).
+    """
+    groups = ((key, list(rows)) for key, rows in groupby(targets, key=lambda row: row[0]))
+    source = next(sources, None)
+    group = next(groups, None)
+    while source is not None or group is not None:
+        if group is None or (source is not None and source[0] < group[0]):
+            yield source, []
+            source = next(sources, None)
+        elif source is None or group[0] < source[0]:
+            yield None, group[1]
+            group = next(groups, None)
+        else:
+            yield source, group[1]
+            source = next(sources, None)
+            group = next(groups, None)
+
+
+class SyncCheck(models.Model):
+    _name = "pg.sync.check"
+    _description = "Community Sync Consistency Check"
+    _order = "id desc"
+    _rec_name = "create_date"
+
+    state = fields.Selection(
+        [("running", "Running"), ("done", "Done"), ("failed", "Failed")],
+        default="running",
+        required=True,
+    )
+    source_db = fields.Char(string="Source Database")
+    target_db = fields.Char(string="Target Database")
+    source_count = fields.Integer(string="Source Invoices")
+    target_count = fields.Integer(string="Replicas")
+    missing_count = fields.Integer(string="Missing")
+    duplicate_count = fields.Integer(string="Duplicates")
+    mismatch_count = fields.Integer(string="Mismatches")
+    orphan_count = fields.Integer(string="Orphans")
+    duration = fields.Float(string="Duration (s)")
+    error = fields.Text()
+    line_ids = fields.One2many("pg.sync.check.line", "check_id", string="Discrepancies")
+
+    @api.model
+    def _cron_check_consistency(self):
+        self.create({})._run()
+
+    def _run(self):
+        """
+        Compare the invoices flagged as synced in the source database with their replicas
+        in the target database. Both sides are read through server-side cursors in
+        ``x_original_invoice_id`` order and merged in one pass, so memory stays constant
+        whatever the number of invoices; discrepancies are written in chunks.
+        """
+        self.ensure_one()
+        config = self.env["pg.sync.config"]._get_config()
+        self.write({"source_db": config.source_db, "target_db": config.target_db})
+        started = time.perf_counter()
+        counts = dict.fromkeys(("source", "target", "missing", "duplicate", "mismatch", "orphan"), 0)
+        buffer = []
+
+        try:
+            with odoo.sql_db.db_connect(config.source_db).cursor() as source_cr, \
+                    odoo.sql_db.db_connect(config.target_db).cursor() as target_cr:
+                if not column_exists(source_cr, "account_move", "x_studio_community"):
+                    raise UserError(_("Column account_move.x_studio_community is missing in %s.", config.source_db))
+                if not column_exists(target_cr, "account_move", "x_original_invoice_id"):
+                    raise UserError(_("Column account_move.x_original_invoice_id is missing in %s.", config.target_db))
+
+                sources = _stream(source_cr, "pg_sync_check_source", SOURCE_QUERY, (CDC_MOVE_TYPES,))
+                targets = _stream(target_cr, "pg_sync_check_target", TARGET_QUERY)
+                for source, replicas in _merge(sources, targets):
+                    counts["source"] += source is not None
+                    counts["target"] += len(replicas)
+                    for kind, vals in self._compare(source, replicas):
+                        counts[kind] += 1
+                        buffer.append({"check_id": self.id, "kind": kind, **vals})
+                    if len(buffer) >= CHECK_FLUSH_SIZE:
+                        self.env["pg.sync.check.line"].create(buffer)
+                        buffer = []
+                        self.env.invalidate_all()
+        except Exception as e:
+            _logger.error("❌ Consistency check failed: %s", str(e))
+            self.write({"state": "failed", "error": str(e)})
+            return
+
+        self.env["pg.sync.check.line"].create(buffer)
+        self.write({
+            "state": "done",
+            "duration": time.perf_counter() - started,
+            **{f"{kind}_count": count for kind, count in counts.items()},
+        })
+        _logger.info(
+            "🔍 Consistency check %s: %s invoice(s), %s replica(s), %s missing, %s duplicate, %s mismatch, %s orphan in %.1fs",
+            self.id, counts["source"], counts["target"], counts["missing"], counts["duplicate"],
+            counts["mismatch"], counts["orphan"], self.duration,
+        )
+
+    @api.model
+    def _compare(self, source, replicas):
+        """Yield ``(kind, values)`` for each discrepancy between a source invoice and its replicas."""
+        if source is None:
+            for original_id, target_id, target_name, _untaxed, target_total, _lines in replicas:
+                yield "orphan", {
+                    "source_id": original_id, "target_ids": str(target_id),
+                    "target_name": target_name, "target_amount": target_total,
+                }
+            return
+
+        source_id, source_name, source_untaxed, source_total, source_lines = source
+        vals = {"source_id": source_id, "source_name": source_name, "source_amount": source_total}
+        if not replicas:
+            yield "missing", vals
+            return
+
+        target_ids = ",".join(str(replica[1]) for replica in replicas)
+        if len(replicas) > 1:
+            yield "duplicate", {**vals, "target_ids": target_ids, "note": _("%s replicas", len(replicas))}
+
+        _original_id, target_id, target_name, target_untaxed, target_total, target_lines = replicas[0]
+        differences = []
+        if float_compare(source_untaxed or 0.0, target_untaxed or 0.0, precision_digits=2):
+            differences.append(_("untaxed %s != %s", source_untaxed, target_untaxed))
+        if float_compare(source_total or 0.0, target_total or 0.0, precision_digits=2):
+            differences.append(_("total %s != %s", source_total, target_total))
+        if (source_lines or 0) != (target_lines or 0):
+            differences.append(_("lines %s != %s", source_lines, target_lines))
+        if differences:
+            yield "mismatch", {
+                **vals, "target_ids": str(target_id), "target_name": target_name,
+                "target_amount": target_total, "note": ", ".join(differences),
+            }
+
+
+class SyncCheckLine(models.Model):
+    _name = "pg.sync.check.line"
+    _description = "Community Sync Consistency Discrepancy"
+    _order = "check_id, source_id"
+
+    check_id = fields.Many2one("pg.sync.check", required=True, ondelete="cascade", index=True)
+    kind = fields.Selection(
+        [
+            ("missing", "Missing Replica"),
+            ("duplicate", "Duplicate Replicas"),
+            ("mismatch", "Amount Mismatch"),
+            ("orphan", "Orphan Replica"),
+        ],
+        required=True,
+    )
+    source_id = fields.Integer(string="Source Invoice ID")
+    source_name = fields.Char(string="Source Invoice")
+    source_amount = fields.Float(string="Source Total")
+    target_ids = fields.Char(string="Replica IDs")
+    target_name = fields.Char(string="Replica")
+    target_amount = fields.Float(string="Replica Total")
+    note = fields.Char()
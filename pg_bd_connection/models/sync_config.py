@@ -0,0 +1,241 @@
+import logging
+from contextlib import contextmanager, nullcontext
+
+import odoo
+from psycopg2 import sql
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import column_exists
+
+from .sync_cache import sync_cache
+
+_logger = logging.getLogger(__name__)
+
+# Columns the target database needs for the replicated invoices
+TARGET_COLUMNS = [
+    ("account_move", "delivery_count", "INTEGER DEFAULT 0"),
+]
+
+# (target_db, uid) pairs already prepared by this worker
+_ready_targets = set()
+
+
+def _ensure_column(cr, table, column, column_def):
+    """Ensure a column exists in the given table."""
+    if not column_exists(cr, table, column):
+        _logger.warning("Column %s.%s missing. Creating it.", table, column)
+        cr.execute(
+            sql.SQL("ALTER TABLE {} ADD COLUMN {} {}")
+            .format(sql.Identifier(table), sql.Identifier(column), sql.SQL(column_def))
+        )
+
+
+class SyncConfig(models.Model):
+    _name = "pg.sync.config"
+    _description = "Community Sync Settings"
+
+    name = fields.Char(required=True, default="Community")
+    active = fields.Boolean(default=True)
+    source_db = fields.Char(string="Source Database", required=True, default="PICCOLO")
+    target_db = fields.Char(string="Target Database", required=True, default="PICCOLO_COMMUNITY")
+    commit_mode = fields.Selection(
+        [("sequential", "Sequential"), ("two_phase", "Two-Phase Commit")],
+        required=True,
+        default="sequential",
+        help="Sequential: invoices are posted and committed in the source database before they are "
+             "replicated.\nTwo-Phase Commit: posting and replication are prepared in both databases "
+             "and committed together, or not at all. Needs max_prepared_transactions > 0 in PostgreSQL.",
+    )
+    source_sale_journal_id = fields.Integer(
+        string="Source Sales Journal ID",
+        default=50,
+        help="Journal set on the invoices of the source database before they are posted.",
+    )
+    target_sale_journal_id = fields.Integer(
+        string="Target Sales Journal ID",
+        help="Journal of the replicated invoices. Leave empty to use the first sales journal.",
+    )
+    target_payment_journal_id = fields.Integer(
+        string="Target Payment Journal ID",
+        default=14,
+        help="Journal of the replicated payments.",
+    )
+    company_map_ids = fields.One2many("pg.sync.config.company", "config_id", string="Company Mapping")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._clear_sync_caches()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._clear_sync_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._clear_sync_caches()
+        return res
+
+    @api.constrains("commit_mode", "source_db")
+    def _check_commit_mode(self):
+        for config in self:
+            if config.commit_mode == "two_phase" and config.source_db == self.env.cr.dbname:
+                raise ValidationError(_(
+                    "Two-Phase Commit needs a source database other than this one: the invoices "
+                    "would be posted on a second connection to the database of the caller."
+                ))
+
+    def _clear_sync_caches(self):
+        self.env.registry.clear_cache()
+        sync_cache.clear()
+        _ready_targets.clear()
+
+    @api.model
+    def _get_config(self):
+        """Return the active settings; they are looked up once per worker and cached."""
+        config = self.browse(self._get_config_id())
+        if not config:
+            raise UserError(_("No active Community Sync settings found."))
+        return config
+
+    @tools.ormcache()
+    def _get_config_id(self):
+        return self.sudo().search([], limit=1).id
+
+    def _company_map(self):
+        """Return ``{source company id: target company id}`` for the mapped companies."""
+        self.ensure_one()
+        return {line.source_company_id: line.target_company_id for line in self.sudo().company_map_ids}
+
+    @contextmanager
+    def _source_cursor(self, run=None, tpc=None):
+        """Yield a cursor on the source database, enlisted in ``tpc`` (a ``TwoPhaseCommit``) when given."""
+        with run.stage("registry") if run else nullcontext():
+            registry = odoo.registry(self.source_db)
+        if not registry:
+            raise ValueError(f"❌ Registry for database {self.source_db} not found!")
+        with registry.cursor() as cr:
+            if tpc:
+                tpc.begin(cr, "source")
+            if run:
+                run.track(cr)
+            try:
+                yield cr
+            except Exception:
+                if tpc:
+                    tpc.rollback()
+                raise
+
+    @contextmanager
+    def _target_env(self, uid, run=None, tpc=None):
+        """
+        Yield an environment on the target database with access to all its companies.
+        The registry and the company ids are loaded once per worker and reused; the
+        transaction is committed when the block exits without error, unless it is
+        enlisted in ``tpc`` (a ``TwoPhaseCommit``). The registry and company setup are
+        timed as stages of ``run`` (a ``SyncRun``) when given.
+        """
+        self.ensure_one()
+        stage = run.stage if run else lambda name: nullcontext()
+        with stage("registry"):
+            registry = odoo.registry(self.target_db)
+        if not registry:
+            raise ValueError(f"❌ Registry for database {self.target_db} not found!")
+
+        with registry.cursor() as cr:
+            if tpc:
+                tpc.begin(cr, "target")
+            try:
+                if run:
+                    run.track(cr)
+                with stage("company"):
+                    env = api.Environment(cr, uid, {})
+                    companies = sync_cache.resolve(
+                        self.env, env, "res.company", ["all"],
+                        lambda keys: ({"all": env["res.company"].sudo().search([]).ids}, {}),
+                    )["all"]
+                    if not companies:
+                        raise ValueError(f"❌ No companies found in database {self.target_db}")
+                    target_env = api.Environment(cr, uid, {
+                        "allowed_company_ids": companies,
+                        "force_company": companies[0],
+                    })
+                    ready_key = (self.target_db, uid)
+                    if ready_key not in _ready_targets:
+                        self._prepare_target(target_env)
+                        cr.postcommit.add(lambda: _ready_targets.add(ready_key))
+                yield target_env
+            except Exception:
+                if tpc:
+                    tpc.rollback()
+                raise
+
+    def _prepare_target(self, target_env):
+        """
+        Prepare the target database for the sync: create the columns it is missing and give
+        the syncing user access to all its companies. Runs on install/upgrade and otherwise
+        once per worker and user, so the sync itself does no catalog queries nor user writes.
+        """
+        for table, column, column_def in TARGET_COLUMNS:
+            _ensure_column(target_env.cr, table, column, column_def)
+
+        companies = target_env.context["allowed_company_ids"]
+        user = target_env["res.users"].sudo().browse(target_env.uid)
+        missing = set(companies) - set(user.company_ids.ids)
+        if missing:
+            _logger.info("🔹 Granting user %s access to companies %s in %s", user.login, sorted(missing), self.target_db)
+            user.write({"company_ids": [(4, company_id) for company_id in sorted(missing)]})
+
+    @api.model
+    def _prepare_targets(self):
+        """Install/upgrade step: prepare the target database of every setting."""
+        for config in self.search([]):
+            try:
+                with config._target_env(self.env.uid):
+                    pass
+            except Exception as e:
+                # The target database may not exist yet; it is then prepared on first sync
+                _logger.warning("⚠ Could not prepare target database %s: %s", config.target_db, str(e))
+
+    def action_prepare_target(self):
+        self.ensure_one()
+        _ready_targets.discard((self.target_db, self.env.uid))
+        with self._target_env(self.env.uid):
+            pass  # the target is prepared when the environment is opened
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {"title": _("Community Sync"), "message": _("Target database %s is ready.", self.target_db), "type": "success"},
+        }
+
+    def action_test_connection(self):
+        self.ensure_one()
+        try:
+            with self._target_env(self.env.uid) as target_env:
+                message = _("Connected to %s (%s companies).", self.target_db, len(target_env.context["allowed_company_ids"]))
+                if self.commit_mode == "two_phase":
+                    target_env.cr.execute("SHOW max_prepared_transactions")
+                    if not int(target_env.cr.fetchone()[0]):
+                        raise UserError(_("Prepared transactions are disabled, set max_prepared_transactions in PostgreSQL."))
+        except Exception as e:
+            raise UserError(_("Connection failed: %s", e))
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {"title": _("Community Sync"), "message": message, "type": "success"},
+        }
+
+
+class SyncConfigCompany(models.Model):
+    _name = "pg.sync.config.company"
+    _description = "Community Sync Company Mapping"
+
+    config_id = fields.Many2one("pg.sync.config", required=True, ondelete="cascade")
+    source_company_id = fields.Integer(string="Source Company ID", required=True)
+    target_company_id = fields.Integer(string="Target Company ID", required=True)
+
+    _sql_constraints = [
+        ("source_company_uniq", "UNIQUE(config_id, source_company_id)", "A source company can only be mapped once."),
+    ]
@@ -0,0 +1,173 @@
+import logging
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 60  # seconds, doubled after every failed attempt
+RETRY_MAX_DELAY = 6 * 3600
+DONE_JOBS_RETENTION_DAYS = 30
+# Seconds a cron run keeps claiming batches; well under the cron real-time limit
+# (limit_time_real_cron, else limit_time_real: 120 s by default)
+TIME_LIMIT_PARAM = "pg_bd_connection.sync_job_time_limit"
+TIME_LIMIT = 60
+
+
+class SyncJob(models.Model):
+    _name = "pg.sync.job"
+    _description = "Community database sync job"
+    _order = "id desc"
+
+    name = fields.Char(compute="_compute_name")
+    res_model = fields.Selection(
+        [("account.move", "Invoice"), ("account.payment", "Payment")],
+        string="Document Type",
+        required=True,
+    )
+    res_id = fields.Integer(string="Document ID", required=True)
+    state = fields.Selection(
+        [("pending", "Pending"), ("done", "Done"), ("failed", "Failed")],
+        default="pending",
+        required=True,
+    )
+    attempts = fields.Integer(default=0)
+    max_attempts = fields.Integer(default=5)
+    next_attempt_date = fields.Datetime(default=fields.Datetime.now, required=True)
+    date_done = fields.Datetime(string="Done On")
+    last_error = fields.Text()
+
+    def init(self):
+        # Partial index scanned by the workers: only the jobs still waiting are in it
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS pg_sync_job_pending_index
+                ON pg_sync_job (next_attempt_date, id)
+             WHERE state = 'pending'
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS pg_sync_job_document_index
+                ON pg_sync_job (res_model, res_id)
+        """)
+
+    @api.depends("res_model", "res_id")
+    def _compute_name(self):
+        for job in self:
+            record = self.env[job.res_model].browse(job.res_id).exists() if job.res_model else None
+            job.name = record.display_name if record else f"{job.res_model},{job.res_id}"
+
+    @api.model
+    def _enqueue(self, records):
+        """Create pending jobs for ``records``, skipping those already waiting in the queue."""
+        queued = self.search([
+            ("res_model", "=", records._name),
+            ("res_id", "in", records.ids),
+            ("state", "=", "pending"),
+        ])
+        queued_ids = set(queued.mapped("res_id"))
+        jobs = self.create([
+            {"res_model": records._name, "res_id": res_id}
+            for res_id in records.ids if res_id not in queued_ids
+        ])
+        _logger.info("📥 Queued %s %s record(s) for sync", len(jobs), records._name)
+        return queued | jobs
+
+    def _queued_notification(self):
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Community Sync"),
+                "message": _("%s document(s) queued for synchronization.") % len(self),
+                "type": "info",
+                "sticky": False,
+            },
+        }
+
+    @api.model
+    def _result_notification(self, records, errors):
+        """Client notification summarizing the synchronization of ``records``."""
+        message = _("%s document(s) synced.") % (len(records) - len(errors))
+        if errors:
+            message += "\n" + _("%s document(s) failed:") % len(errors)
+            message += "".join(f"\n- {records.browse(res_id).display_name}: {error}" for res_id, error in errors.items())
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Community Sync"),
+                "message": message,
+                "type": "warning" if errors else "success",
+                "sticky": bool(errors),
+            },
+        }
+
+    def _lock_pending(self, limit):
+        """Claim up to ``limit`` due jobs; rows locked by another worker are skipped."""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id FROM pg_sync_job
+             WHERE state = 'pending' AND next_attempt_date <= %s
+          ORDER BY next_attempt_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (fields.Datetime.now(), limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _cron_process_jobs(self, batch_size=50, time_limit=None):
+        """
+        Drain the queue in batches. Each batch is claimed with ``FOR UPDATE SKIP LOCKED`` and
+        committed on its own, so several cron workers can run this method in parallel.
+        No batch is started after ``time_limit`` seconds (``TIME_LIMIT_PARAM``), so the
+        worker is not killed between the target commit of a batch and its own.
+        """
+        if time_limit is None:
+            time_limit = int(self.env["ir.config_parameter"].sudo().get_param(TIME_LIMIT_PARAM, TIME_LIMIT))
+        started = time.monotonic()
+        while time.monotonic() - started < time_limit:
+            jobs = self._lock_pending(batch_size)
+            if not jobs:
+                break
+            jobs._process()
+            self.env.cr.commit()
+
+    @api.autovacuum
+    def _gc_done_jobs(self):
+        limit_date = fields.Datetime.now() - timedelta(days=DONE_JOBS_RETENTION_DAYS)
+        self.search([("state", "=", "done"), ("date_done", "<", limit_date)]).unlink()
+
+    def action_process(self):
+        """Process the selected pending jobs right away."""
+        self.filtered(lambda j: j.state == "pending")._process()
+
+    def action_retry(self):
+        self.write({"state": "pending", "attempts": 0, "next_attempt_date": fields.Datetime.now(), "last_error": False})
+
+    def _process(self):
+        for res_model in set(self.mapped("res_model")):
+            jobs = self.filtered(lambda j: j.res_model == res_model)
+            records = self.env[res_model].browse(jobs.mapped("res_id")).exists()
+            errors = {res_id: _("Document no longer exists.") for res_id in set(jobs.mapped("res_id")) - set(records.ids)}
+            try:
+                with self.env.cr.savepoint():
+                    errors.update(records._sync_from_queue())
+            except Exception as e:
+                _logger.error("❌ Sync batch of %s %s failed: %s", len(records), res_model, str(e))
+                errors.update({res_id: str(e) for res_id in records.ids})
+            jobs._mark_processed(errors)
+
+    def _mark_processed(self, errors):
+        now = fields.Datetime.now()
+        done = self.filtered(lambda j: j.res_id not in errors)
+        done.write({"state": "done", "date_done": now, "last_error": False})
+        for job in self - done:
+            attempts = job.attempts + 1
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            job.write({
+                "attempts": attempts,
+                "state": "failed" if attempts >= job.max_attempts else "pending",
+                "next_attempt_date": now + timedelta(seconds=delay),
+                "last_error": errors[job.res_id],
+            })
+        _logger.info("✅ Processed %s sync job(s): %s done, %s failed", len(self), len(done), len(self - done))
@@ -0,0 +1,184 @@
+import logging
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+LOG_RETENTION_DAYS = 90
+
+SYNC_STAGES = [
+    ("registry", "Registry"),
+    ("company", "Company Setup"),
+    ("partner", "Partners"),
+    ("journal", "Journal"),
+    ("invoice", "Invoice Lookup"),
+    ("lines", "Lines"),
+    ("create", "Create"),
+    ("post", "Post"),
+    ("reconcile", "Reconcile"),
+    ("commit", "Commit"),
+    ("finalize", "Mark as Synced"),
+]
+
+
+class SyncRun:
+    """
+    Collects the wall time and query count of each stage of one sync run. Queries are
+    counted on every cursor registered with ``track`` (source, target and current one);
+    a stage entered several times (e.g. the one-by-one fallbacks) is accumulated.
+    """
+
+    def __init__(self, env, res_model, records):
+        self.env = env
+        self.res_model = res_model
+        self.record_count = len(records)
+        self.date_start = fields.Datetime.now()
+        self.started = time.perf_counter()
+        self.cursors = [env.cr]
+        self.stages = {}  # stage -> [duration_ms, query_count]
+        self.errors = {}  # record id -> error message, set by the sync
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.save(self.errors, exc_value)
+
+    def track(self, cr):
+        if cr not in self.cursors:
+            self.cursors.append(cr)
+
+    def _query_count(self):
+        return sum(cr.sql_log_count for cr in self.cursors)
+
+    @contextmanager
+    def stage(self, name):
+        queries = self._query_count()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, [0.0, 0])
+            totals[0] += (time.perf_counter() - started) * 1000
+            totals[1] += self._query_count() - queries
+
+    def save(self, errors=None, exception=None):
+        """Store the run in its own transaction, so it is kept even when the sync rolls back."""
+        errors = errors or {}
+        duration = (time.perf_counter() - self.started) * 1000
+        if exception:
+            state = "failed"
+        elif errors:
+            state = "partial" if len(errors) < self.record_count else "failed"
+        else:
+            state = "success"
+        _logger.info(
+            "⏱ %s sync of %s record(s) %s in %.0f ms: %s",
+            self.res_model, self.record_count, state, duration,
+            ", ".join(f"{stage} {ms:.0f} ms/{queries} q" for stage, (ms, queries) in self.stages.items()),
+        )
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, self.env.context)
+                env["pg.sync.log"].sudo().create({
+                    "res_model": self.res_model,
+                    "record_count": self.record_count,
+                    "error_count": self.record_count if exception else len(errors),
+                    "state": state,
+                    "date_start": self.date_start,
+                    "duration_ms": duration,
+                    "query_count": sum(queries for _ms, queries in self.stages.values()),
+                    "error": str(exception) if exception else "\n".join(str(e) for e in errors.values()) or False,
+                    "stage_ids": [
+                        (0, 0, {"stage": stage, "sequence": index, "duration_ms": ms, "query_count": queries})
+                        for index, (stage, (ms, queries)) in enumerate(self.stages.items())
+                    ],
+                })
+        except Exception:
+            _logger.exception("Could not store the sync log")
+
+
+class SyncLog(models.Model):
+    _name = "pg.sync.log"
+    _description = "Community Sync Run"
+    _order = "date_start desc, id desc"
+    _rec_name = "date_start"
+
+    res_model = fields.Selection(
+        [("account.move", "Invoice"), ("account.payment", "Payment")],
+        string="Document Type",
+        required=True,
+    )
+    record_count = fields.Integer(string="Documents")
+    error_count = fields.Integer(string="Errors")
+    state = fields.Selection(
+        [("success", "Success"), ("partial", "Partial"), ("failed", "Failed")],
+        required=True,
+    )
+    date_start = fields.Datetime(string="Started On", required=True, index=True)
+    duration_ms = fields.Float(string="Duration (ms)", group_operator="avg")
+    query_count = fields.Integer(string="Queries")
+    error = fields.Text()
+    stage_ids = fields.One2many("pg.sync.log.stage", "log_id", string="Stages")
+
+    @api.autovacuum
+    def _gc_old_logs(self):
+        limit_date = fields.Datetime.now() - timedelta(days=LOG_RETENTION_DAYS)
+        self.search([("date_start", "<", limit_date)]).unlink()
+
+
+class SyncLogStage(models.Model):
+    _name = "pg.sync.log.stage"
+    _description = "Community Sync Run Stage"
+    _order = "log_id, sequence"
+
+    log_id = fields.Many2one("pg.sync.log", required=True, ondelete="cascade", index=True)
+    sequence = fields.Integer()
+    stage = fields.Selection(SYNC_STAGES, required=True)
+    duration_ms = fields.Float(string="Duration (ms)")
+    query_count = fields.Integer(string="Queries")
+
+
+class SyncStageStats(models.Model):
+    _name = "pg.sync.stage.stats"
+    _description = "Community Sync Stage Latency"
+    _auto = False
+    _order = "date desc, res_model, stage"
+
+    date = fields.Date(readonly=True)
+    res_model = fields.Selection(
+        [("account.move", "Invoice"), ("account.payment", "Payment")],
+        string="Document Type",
+        readonly=True,
+    )
+    stage = fields.Selection(SYNC_STAGES, readonly=True)
+    samples = fields.Integer(readonly=True)
+    avg_ms = fields.Float(string="Average (ms)", readonly=True, group_operator="avg")
+    p50_ms = fields.Float(string="p50 (ms)", readonly=True, group_operator="max")
+    p95_ms = fields.Float(string="p95 (ms)", readonly=True, group_operator="max")
+    max_ms = fields.Float(string="Max (ms)", readonly=True, group_operator="max")
+    avg_queries = fields.Float(string="Average Queries", readonly=True, group_operator="avg")
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT row_number() OVER (ORDER BY day, l.res_model, s.stage) AS id,
+                       day AS date,
+                       l.res_model,
+                       s.stage,
+                       count(*) AS samples,
+                       avg(s.duration_ms) AS avg_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY s.duration_ms) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY s.duration_ms) AS p95_ms,
+                       max(s.duration_ms) AS max_ms,
+                       avg(s.query_count) AS avg_queries
+                  FROM pg_sync_log_stage s
+                  JOIN pg_sync_log l ON l.id = s.log_id,
+                       LATERAL (SELECT l.date_start::date AS day) d
+              GROUP BY day, l.res_model, s.stage
+            )
+        """)
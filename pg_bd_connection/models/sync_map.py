@@ -0,0 +1,117 @@
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+
+class SyncMap(models.Model):
+    _name = "pg.sync.map"
+    _description = "Source to target record mapping for database sync"
+    _rec_name = "model"
+
+    model = fields.Char(required=True)
+    source_id = fields.Integer(required=True)
+    target_id = fields.Integer(required=True)
+    source_db = fields.Char(required=True)
+    target_db = fields.Char(required=True)
+    sync_hash = fields.Char(help="Digest of the values last replicated, used to skip unchanged records.")
+
+    _sql_constraints = [
+        (
+            "source_uniq",
+            "UNIQUE(source_db, target_db, model, source_id)",
+            "A source record can only be mapped once per target database.",
+        ),
+    ]
+
+    def init(self):
+        create_index(self.env.cr, "pg_sync_map_target_index", self._table, ["target_db", "model", "target_id"])
+
+    @api.model
+    def _get_targets(self, model, source_ids, source_db, target_db):
+        """Return ``{source_id: target_id}`` for the mapped ``source_ids``, in one indexed query."""
+        if not source_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute(
+            """SELECT source_id, target_id FROM pg_sync_map
+                WHERE source_db = %s AND target_db = %s AND model = %s AND source_id = ANY(%s)""",
+            (source_db, target_db, model, list(source_ids)),
+        )
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_entries(self, model, source_ids, source_db, target_db):
+        """Return ``{source_id: (target_id, sync_hash)}`` for the mapped ``source_ids``."""
+        if not source_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute(
+            """SELECT source_id, target_id, sync_hash FROM pg_sync_map
+                WHERE source_db = %s AND target_db = %s AND model = %s AND source_id = ANY(%s)""",
+            (source_db, target_db, model, list(source_ids)),
+        )
+        return {source_id: (target_id, sync_hash) for source_id, target_id, sync_hash in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_sources(self, model, target_ids, source_db, target_db):
+        """Return ``{target_id: source_id}`` for the mapped ``target_ids`` (reverse lookup)."""
+        if not target_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute(
+            """SELECT target_id, source_id FROM pg_sync_map
+                WHERE source_db = %s AND target_db = %s AND model = %s AND target_id = ANY(%s)""",
+            (source_db, target_db, model, list(target_ids)),
+        )
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _set_targets(self, model, mapping, source_db, target_db, hashes=None):
+        """
+        Insert or update the ``{source_id: target_id}`` mapping in a single statement.
+        ``hashes`` optionally gives the new ``sync_hash`` per source id; others keep theirs.
+        """
+        if not mapping:
+            return
+        hashes = hashes or {}
+        self.flush_model()
+        self.env.cr.execute(
+            """INSERT INTO pg_sync_map (model, source_id, target_id, sync_hash, source_db, target_db,
+                                        create_uid, create_date, write_uid, write_date)
+                SELECT %s, m.source_id, m.target_id, m.sync_hash, %s, %s, %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+                  FROM unnest(%s::int[], %s::int[], %s::varchar[]) AS m(source_id, target_id, sync_hash)
+           ON CONFLICT (source_db, target_db, model, source_id)
+             DO UPDATE SET target_id = EXCLUDED.target_id,
+                           sync_hash = COALESCE(EXCLUDED.sync_hash, pg_sync_map.sync_hash),
+                           write_uid = EXCLUDED.write_uid,
+                           write_date = EXCLUDED.write_date""",
+            (
+                model, source_db, target_db, self.env.uid, self.env.uid,
+                list(mapping.keys()), list(mapping.values()), [hashes.get(key) for key in mapping],
+            ),
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _commit_targets(self, model, mapping, source_db, target_db, hashes=None):
+        """
+        ``_set_targets`` in a transaction of its own, committed right away, so the mapping
+        is kept even if the caller's transaction is rolled back later. Call it before
+        committing the target records: a mapping to a target that was never committed is
+        detected by checking that the target exists.
+        """
+        if not mapping:
+            return
+        with self.env.registry.cursor() as cr:
+            self.with_env(self.env(cr=cr))._set_targets(model, mapping, source_db, target_db, hashes=hashes)
+
+    @api.model
+    def _remove_targets(self, model, source_ids, source_db, target_db):
+        if not source_ids:
+            return
+        self.flush_model()
+        self.env.cr.execute(
+            """DELETE FROM pg_sync_map
+                WHERE source_db = %s AND target_db = %s AND model = %s AND source_id = ANY(%s)""",
+            (source_db, target_db, model, list(source_ids)),
+        )
+        self.invalidate_model()
@@ -0,0 +1,124 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extensions import STATUS_READY, STATUS_PREPARED
+
+import odoo
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+GID_PREFIX = "pg_sync"
+RECOVERY_MIN_AGE = 300  # seconds a prepared transaction is left alone before recovery
+
+
+class TwoPhaseCommit:
+    """
+    Commits the transactions of several databases together with PostgreSQL
+    ``PREPARE TRANSACTION``. All of them are prepared first. The decision to commit is
+    then stored in ``pg.sync.transaction``, and only after that are they committed.
+
+    If a worker dies between the prepare and the commit, prepared transactions are
+    left behind. ``pg.sync.transaction._cron_recover`` resolves them from the stored
+    decision: with a decision they are committed, without one they are rolled back.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.name = f"{GID_PREFIX}:{env.cr.dbname}:{uuid.uuid4().hex}"
+        self.cursors = []
+        self.decided = False
+
+    def begin(self, cr, role):
+        """Start the two-phase transaction of ``cr``, before any statement is run on it."""
+        if cr._cnx.status != STATUS_READY:
+            cr._cnx.rollback()
+        cr._cnx.tpc_begin(f"{self.name}:{role}")
+        self.cursors.append(cr)
+
+    def commit(self):
+        for cr in self.cursors:
+            cr.flush()
+        for cr in self.cursors:
+            cr._cnx.tpc_prepare()
+
+        self._store_decision()
+        self.decided = True
+        try:
+            for cr in self.cursors:
+                cr._cnx.tpc_commit()
+        except Exception:
+            _logger.exception("❌ Could not commit %s, it is left to the recovery cron", self.name)
+            for cr in self.cursors:
+                if cr._cnx.status == STATUS_PREPARED:
+                    cr._cnx.reset()  # keeps the prepared transaction for recovery
+            raise
+        for cr in self.cursors:
+            cr.commit()  # nothing left to commit, runs the post-commit hooks
+        self._forget_decision()
+
+    def rollback(self):
+        for cr in self.cursors:
+            try:
+                if cr._cnx.status != STATUS_READY:
+                    cr._cnx.tpc_rollback()
+            except Exception:
+                _logger.exception("❌ Could not roll back %s on %s", self.name, cr.dbname)
+                cr._cnx.reset()
+            cr.rollback()
+
+    def _store_decision(self):
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            env["pg.sync.transaction"].sudo().create({"name": self.name})
+
+    def _forget_decision(self):
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            env["pg.sync.transaction"].sudo().search([("name", "=", self.name)]).unlink()
+
+
+class SyncTransaction(models.Model):
+    _name = "pg.sync.transaction"
+    _description = "Community Sync Commit Decision"
+    _order = "id"
+
+    name = fields.Char(required=True, index=True)
+
+    @api.model
+    def _cron_recover(self, min_age=RECOVERY_MIN_AGE):
+        """
+        Resolve the transactions this database prepared and never finished. A transaction
+        with a stored commit decision is committed; one without a decision is rolled back.
+        """
+        prefix = f"{GID_PREFIX}:{self.env.cr.dbname}:"
+        limit = datetime.now(timezone.utc) - timedelta(seconds=min_age)
+        decided = set(self.search([]).mapped("name"))
+
+        with odoo.sql_db.db_connect(self.env.cr.dbname).cursor() as cr:
+            # pg_prepared_xacts lists the prepared transactions of every database
+            xids = [xid for xid in cr._cnx.tpc_recover() if (xid.gtrid or "").startswith(prefix)]
+
+        pending = set()
+        for xid in xids:
+            name = xid.gtrid.rsplit(":", 1)[0]
+            if xid.prepared > limit:
+                pending.add(name)
+                continue
+            commit = name in decided
+            try:
+                with odoo.sql_db.db_connect(xid.database).cursor() as cr:
+                    if commit:
+                        cr._cnx.tpc_commit(xid)
+                    else:
+                        cr._cnx.tpc_rollback(xid)
+                _logger.warning("⚠ Recovered %s on %s: %s", xid.gtrid, xid.database, "committed" if commit else "rolled back")
+            except Exception as e:
+                _logger.error("❌ Could not recover %s on %s: %s", xid.gtrid, xid.database, str(e))
+                pending.add(name)
+
+        self.search([
+            ("name", "not in", list(pending)),
+            ("create_date", "<", fields.Datetime.now() - timedelta(seconds=min_age)),
+        ]).unlink()
@@ -1,6 +1,6 @@
 {
     'name': 'Packing List Personalizado',
-    'version': '1.0',
+    'version': '1.1',
     'category': 'Inventory/Inventory',
     'summary': 'Módulo personalizado para gestão de Packing List com cálculo de volumes e peso',
     'description': """
@@ -10,14 +10,15 @@
         Este módulo adiciona funcionalidades avançadas de packing list aos produtos:
         
         * Campos de volume, peso e cubicagem
-        * Dimensões dinâmicas (comprimento, altura, largura) para múltiplos volumes
+        * Dimensões (comprimento, altura, largura, quantidade, peso) para múltiplos volumes
         * Cálculo automático de cubicagem total
-        * Interface dinâmica que mostra campos conforme o número de volumes
-        * Suporte para até 6 volumes diferentes
+        * Número ilimitado de volumes por produto
         
         Funcionalidades:
         ----------------
-        * Campos de dimensão aparecem dinamicamente baseados no número de volumes
+        * Dimensões gravadas numa lista editável, uma linha por tipo de volume
+        * Cubicagem calculada com uma consulta agrupada por lote de produtos
+        * Importação em massa de dimensões (CSV) com recálculo por lotes das vendas e entregas
         * Cálculo automático de peso total e cubicagem
         * Formatação numérica com 2 casas decimais
         * Interface otimizada para gestão de packing lists
@@ -30,6 +31,7 @@
         'views/stock_picking_views.xml',
         'views/sale_order_views.xml',
         'wizard/cubicagem_wizard_views.xml',
+        'wizard/packing_import_wizard_views.xml',
         'security/ir.model.access.csv',
     ],
     'installable': True,
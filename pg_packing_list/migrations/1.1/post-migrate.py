@@ -0,0 +1,40 @@
+from odoo import SUPERUSER_ID
+from odoo.tools.sql import column_exists
+
+# Dimension columns of the six fixed volumes, replaced by product.packing.volume
+OLD_DIMENSION_COLUMNS = [
+    ('packing_comprimento', 'packing_altura', 'packing_largura'),
+] + [
+    (f'packing_comprimento_{index}', f'packing_altura_{index}', f'packing_largura_{index}')
+    for index in range(2, 7)
+]
+
+
+def migrate(cr, version):
+    """
+    Copy the dimensions of the fixed volume columns into product.packing.volume lines.
+    The volumes counted by the number of volumes (at most six) are copied, the last one
+    with the fractional part of that number as its quantity, so the lines add up to the
+    number of volumes. The stored cubicagem is then set from the lines, as the ORM does
+    not recompute it for rows inserted here.
+    """
+    if not column_exists(cr, 'product_template', 'packing_comprimento'):
+        return
+    for index, (length, height, width) in enumerate(OLD_DIMENSION_COLUMNS, start=1):
+        cr.execute(f"""
+            INSERT INTO product_packing_volume (product_tmpl_id, sequence, comprimento, altura, largura, quantidade, peso,
+                                                create_uid, create_date, write_uid, write_date)
+            SELECT id, %(sequence)s, COALESCE({length}, 0), COALESCE({height}, 0), COALESCE({width}, 0),
+                   LEAST(LEAST(packing_volumes, 6) - %(index)s + 1, 1), 0,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM product_template
+             WHERE LEAST(packing_volumes, 6) > %(index)s - 1
+        """, {'sequence': index * 10, 'index': index, 'uid': SUPERUSER_ID})
+    cr.execute("""
+        UPDATE product_template t
+           SET packing_cubicagem = v.cubicagem
+          FROM (SELECT product_tmpl_id, SUM(comprimento * altura * largura * quantidade) AS cubicagem
+                  FROM product_packing_volume
+              GROUP BY product_tmpl_id) v
+         WHERE t.id = v.product_tmpl_id
+    """)
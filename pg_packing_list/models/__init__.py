@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import product_packing_volume
 from . import product_template
 from . import stock_picking
 from . import sale_order
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+
+class ProductPackingVolume(models.Model):
+    _name = 'product.packing.volume'
+    _description = 'Volume de Packing List do Produto'
+    _order = 'product_tmpl_id, sequence, id'
+
+    product_tmpl_id = fields.Many2one(
+        'product.template',
+        string='Produto',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    sequence = fields.Integer(string='Sequência', default=10)
+
+    comprimento = fields.Float(string='Comprimento', digits=(4, 2), default=0.0)
+    altura = fields.Float(string='Altura', digits=(4, 2), default=0.0)
+    largura = fields.Float(string='Largura', digits=(4, 2), default=0.0)
+    quantidade = fields.Float(
+        string='Quantidade',
+        digits=(4, 2),
+        default=1.0,
+        help='Número de volumes com estas dimensões'
+    )
+    peso = fields.Float(
+        string='Peso (Kg)',
+        digits=(4, 2),
+        default=0.0,
+        help='Peso de cada volume em quilogramas'
+    )
+
+    cubicagem = fields.Float(
+        string='Cubicagem',
+        digits=(4, 2),
+        compute='_compute_cubicagem',
+        help='Cubicagem destes volumes (comprimento x altura x largura x quantidade)'
+    )
+
+    @api.constrains('comprimento', 'altura', 'largura', 'quantidade', 'peso')
+    def _check_dimensions_positive(self):
+        for volume in self:
+            for field_name in ('comprimento', 'altura', 'largura', 'quantidade', 'peso'):
+                if volume[field_name] < 0:
+                    raise ValidationError(
+                        f"O valor '{volume._fields[field_name].string}' do volume não pode ser negativo."
+                    )
+
+    def unlink(self):
+        templates = self.product_tmpl_id
+        res = super().unlink()
+        # Produtos que ficaram sem dimensões perdem os volumes e o peso que vinham delas
+        templates.filtered(lambda t: not t.packing_volume_ids).write({'packing_volumes': 0.0, 'packing_weight': 0.0})
+        return res
+
+    @api.depends('comprimento', 'altura', 'largura', 'quantidade')
+    def _compute_cubicagem(self):
+        for volume in self:
+            volume.cubicagem = volume.comprimento * volume.altura * volume.largura * volume.quantidade
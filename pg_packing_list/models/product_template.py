@@ -1,25 +1,50 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import time
+
+from psycopg2.extras import execute_values
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 
+_logger = logging.getLogger(__name__)
+
+# Linhas e documentos recalculados por lote após uma importação de dimensões
+RECOMPUTE_BATCH_SIZE = 2000
+# Erros de validação mostrados ao utilizador
+IMPORT_MAX_ERRORS = 20
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
 
     # Campos principais da packing list
+    packing_volume_ids = fields.One2many(
+        'product.packing.volume',
+        'product_tmpl_id',
+        string='Dimensões dos Volumes',
+        copy=True
+    )
+
     packing_volumes = fields.Float(
         string='Volumes',
         digits=(4, 2),
         default=0.0,
-        help='Número de volumes para este produto'
+        compute='_compute_packing_volumes_weight',
+        store=True,
+        readonly=False,
+        help='Número de volumes para este produto (soma das quantidades das dimensões, quando informadas)'
     )
 
     packing_weight = fields.Float(
         string='Peso (Kg)',
         digits=(4, 2),
         default=0.0,
-        help='Peso total em quilogramas'
+        compute='_compute_packing_volumes_weight',
+        store=True,
+        readonly=False,
+        help='Peso total em quilogramas (soma dos pesos das dimensões, quando informados)'
     )
 
     packing_cubicagem = fields.Float(
@@ -30,36 +55,6 @@ class ProductTemplate(models.Model):
         help='Cubicagem total em m³ calculada automaticamente'
     )
 
-    # Dimensões do primeiro volume (sempre visível)
-    packing_comprimento = fields.Float(string='Comprimento', digits=(4, 2), default=0.0)
-    packing_altura = fields.Float(string='Altura', digits=(4, 2), default=0.0)
-    packing_largura = fields.Float(string='Largura', digits=(4, 2), default=0.0)
-
-    # Volume 2
-    packing_comprimento_2 = fields.Float(string='Comprimento 2', digits=(4, 2), default=0.0)
-    packing_altura_2 = fields.Float(string='Altura 2', digits=(4, 2), default=0.0)
-    packing_largura_2 = fields.Float(string='Largura 2', digits=(4, 2), default=0.0)
-
-    # Volume 3
-    packing_comprimento_3 = fields.Float(string='Comprimento 3', digits=(4, 2), default=0.0)
-    packing_altura_3 = fields.Float(string='Altura 3', digits=(4, 2), default=0.0)
-    packing_largura_3 = fields.Float(string='Largura 3', digits=(4, 2), default=0.0)
-
-    # Volume 4
-    packing_comprimento_4 = fields.Float(string='Comprimento 4', digits=(4, 2), default=0.0)
-    packing_altura_4 = fields.Float(string='Altura 4', digits=(4, 2), default=0.0)
-    packing_largura_4 = fields.Float(string='Largura 4', digits=(4, 2), default=0.0)
-
-    # Volume 5
-    packing_comprimento_5 = fields.Float(string='Comprimento 5', digits=(4, 2), default=0.0)
-    packing_altura_5 = fields.Float(string='Altura 5', digits=(4, 2), default=0.0)
-    packing_largura_5 = fields.Float(string='Largura 5', digits=(4, 2), default=0.0)
-
-    # Volume 6
-    packing_comprimento_6 = fields.Float(string='Comprimento 6', digits=(4, 2), default=0.0)
-    packing_altura_6 = fields.Float(string='Altura 6', digits=(4, 2), default=0.0)
-    packing_largura_6 = fields.Float(string='Largura 6', digits=(4, 2), default=0.0)
-
     # Validações
 
     @api.constrains('packing_volumes')
@@ -67,8 +62,6 @@ class ProductTemplate(models.Model):
         for record in self:
             if record.packing_volumes < 0:
                 raise ValidationError("O número de volumes não pode ser negativo.")
-            if record.packing_volumes > 6:
-                raise ValidationError("O número máximo de volumes suportado é 6.")
 
     @api.constrains('packing_weight')
     def _check_weight_positive(self):
@@ -76,50 +69,271 @@ class ProductTemplate(models.Model):
             if record.packing_weight < 0:
                 raise ValidationError("O peso não pode ser negativo.")
 
-    @api.constrains('packing_comprimento', 'packing_altura', 'packing_largura',
-                    'packing_comprimento_2', 'packing_altura_2', 'packing_largura_2',
-                    'packing_comprimento_3', 'packing_altura_3', 'packing_largura_3',
-                    'packing_comprimento_4', 'packing_altura_4', 'packing_largura_4',
-                    'packing_comprimento_5', 'packing_altura_5', 'packing_largura_5',
-                    'packing_comprimento_6', 'packing_altura_6', 'packing_largura_6')
-    def _check_dimensions_positive(self):
-        for record in self:
-            dimension_fields = [
-                'packing_comprimento', 'packing_altura', 'packing_largura',
-                'packing_comprimento_2', 'packing_altura_2', 'packing_largura_2',
-                'packing_comprimento_3', 'packing_altura_3', 'packing_largura_3',
-                'packing_comprimento_4', 'packing_altura_4', 'packing_largura_4',
-                'packing_comprimento_5', 'packing_altura_5', 'packing_largura_5',
-                'packing_comprimento_6', 'packing_altura_6', 'packing_largura_6'
-            ]
-            for field_name in dimension_fields:
-                if getattr(record, field_name, 0.0) < 0:
-                    raise ValidationError(
-                        f"A dimensão '{record._fields[field_name].string}' não pode ser negativa."
-                    )
-
-    @api.depends(
-        'packing_volumes',
-        'packing_comprimento', 'packing_altura', 'packing_largura',
-        'packing_comprimento_2', 'packing_altura_2', 'packing_largura_2',
-        'packing_comprimento_3', 'packing_altura_3', 'packing_largura_3',
-        'packing_comprimento_4', 'packing_altura_4', 'packing_largura_4',
-        'packing_comprimento_5', 'packing_altura_5', 'packing_largura_5',
-        'packing_comprimento_6', 'packing_altura_6', 'packing_largura_6')
+    def _get_packing_volume_totals(self):
+        """
+        Retorna ``{id do produto: (volumes, peso, cubicagem)}`` somados numa única consulta
+        agrupada sobre as dimensões gravadas dos produtos de ``self``.
+        """
+        template_ids = [template_id for template_id in self.ids if isinstance(template_id, int)]
+        if not template_ids:
+            return {}
+        self.env['product.packing.volume'].flush_model(
+            ['product_tmpl_id', 'comprimento', 'altura', 'largura', 'quantidade', 'peso'])
+        self.env.cr.execute("""
+            SELECT product_tmpl_id,
+                   SUM(quantidade),
+                   SUM(peso * quantidade),
+                   SUM(comprimento * altura * largura * quantidade)
+              FROM product_packing_volume
+             WHERE product_tmpl_id = ANY(%s)
+          GROUP BY product_tmpl_id
+        """, [template_ids])
+        return {
+            template_id: (volumes or 0.0, weight or 0.0, cubicagem or 0.0)
+            for template_id, volumes, weight, cubicagem in self.env.cr.fetchall()
+        }
+
+    def _get_packing_totals(self, product, totals):
+        """Totais de ``product``, lidos de ``totals`` ou somados em memória nos produtos em edição"""
+        if isinstance(product.id, int):
+            return totals.get(product.id, (0.0, 0.0, 0.0))
+        volumes = product.packing_volume_ids
+        return (
+            sum(volumes.mapped('quantidade')),
+            sum(volume.peso * volume.quantidade for volume in volumes),
+            sum(volumes.mapped('cubicagem')),
+        )
+
+    @api.depends('packing_volume_ids.quantidade', 'packing_volume_ids.peso')
+    def _compute_packing_volumes_weight(self):
+        """
+        Volumes e peso seguem as dimensões informadas; produtos sem dimensões (ou sem peso
+        nas dimensões) mantêm o valor introduzido manualmente. Quando a última dimensão é
+        removida, volumes e peso voltam a zero, como a cubicagem.
+        """
+        totals = self._get_packing_volume_totals()
+        for product in self:
+            if not product.packing_volume_ids:
+                # No formulário, o produto gravado ainda tem as dimensões removidas
+                if product._origin.packing_volume_ids and product != product._origin:
+                    product.packing_volumes = 0.0
+                    product.packing_weight = 0.0
+                continue
+            volumes, weight, _cubicagem = self._get_packing_totals(product, totals)
+            product.packing_volumes = volumes
+            if weight:
+                product.packing_weight = weight
+
+    @api.depends('packing_volume_ids.comprimento', 'packing_volume_ids.altura',
+                 'packing_volume_ids.largura', 'packing_volume_ids.quantidade')
     def _compute_packing_cubicagem(self):
-        """Calcula automaticamente a cubicagem baseada nas dimensões informadas"""
+        """Calcula a cubicagem de todos os produtos com uma consulta agrupada"""
+        totals = self._get_packing_volume_totals()
         for product in self:
-            total = 0.0
-            dims = [
-                (product.packing_comprimento, product.packing_altura, product.packing_largura),
-                (product.packing_comprimento_2, product.packing_altura_2, product.packing_largura_2),
-                (product.packing_comprimento_3, product.packing_altura_3, product.packing_largura_3),
-                (product.packing_comprimento_4, product.packing_altura_4, product.packing_largura_4),
-                (product.packing_comprimento_5, product.packing_altura_5, product.packing_largura_5),
-                (product.packing_comprimento_6, product.packing_altura_6, product.packing_largura_6),
-            ]
-            for i in range(int(min(6, product.packing_volumes))):
-                c, a, l = dims[i]
-                total += c * a * l
-            product.packing_cubicagem = total
+            product.packing_cubicagem = self._get_packing_totals(product, totals)[2]
+
+    # Importação em massa
+
+    @api.model
+    def _import_packing_volumes(self, rows):
+        """
+        Importa as dimensões de ``rows``, tuplos ``(linha, referência interna, comprimento,
+        altura, largura, quantidade, peso)``, substituindo as dimensões dos produtos
+        importados. As linhas são validadas em conjunto em SQL e gravadas sem passar pelo
+        ORM; os totais dos produtos e dos documentos que os referem são recalculados no fim,
+        por lotes. Retorna ``{'products': n, 'volumes': n}``.
+        """
+        if not rows:
+            return {'products': 0, 'volumes': 0}
+        self.env['product.packing.volume'].check_access_rights('create')
+        self.env['product.packing.volume'].check_access_rights('unlink')
+        self.env['product.template'].check_access_rights('write')
+        started = time.perf_counter()
+        cr = self.env.cr
+        self.env.flush_all()
+        # A tabela temporária desaparece com o savepoint se a validação falhar
+        with cr.savepoint(flush=False):
+            cr.execute("""
+                CREATE TEMP TABLE pg_packing_import (
+                    line_no integer,
+                    default_code varchar,
+                    product_tmpl_id integer,
+                    comprimento numeric,
+                    altura numeric,
+                    largura numeric,
+                    quantidade numeric,
+                    peso numeric
+                ) ON COMMIT DROP
+            """)
+            execute_values(cr._obj, """
+                INSERT INTO pg_packing_import (line_no, default_code, comprimento, altura, largura, quantidade, peso)
+                VALUES %s
+            """, rows, page_size=5000)
+            cr.execute("""
+                UPDATE pg_packing_import i
+                   SET product_tmpl_id = p.product_tmpl_id
+                  FROM product_product p
+                 WHERE p.default_code = i.default_code AND p.active
+            """)
+
+            # Validação de todas as linhas numa consulta
+            cr.execute("""
+                SELECT i.line_no, i.default_code,
+                       COUNT(DISTINCT p.product_tmpl_id),
+                       LEAST(i.comprimento, i.altura, i.largura, i.quantidade, i.peso) < 0
+                  FROM pg_packing_import i
+             LEFT JOIN product_product p ON p.default_code = i.default_code AND p.active
+              GROUP BY i.line_no, i.default_code, i.comprimento, i.altura, i.largura, i.quantidade, i.peso
+                HAVING COUNT(DISTINCT p.product_tmpl_id) != 1
+                    OR LEAST(i.comprimento, i.altura, i.largura, i.quantidade, i.peso) < 0
+              ORDER BY i.line_no
+            """)
+            invalid = cr.fetchall()
+            if invalid:
+                messages = []
+                for line_no, default_code, templates, negative in invalid[:IMPORT_MAX_ERRORS]:
+                    if not templates:
+                        messages.append(f"Linha {line_no}: produto '{default_code}' não encontrado.")
+                    elif templates > 1:
+                        messages.append(f"Linha {line_no}: a referência '{default_code}' pertence a vários produtos.")
+                    if negative:
+                        messages.append(f"Linha {line_no}: as dimensões, a quantidade e o peso não podem ser negativos.")
+                if len(invalid) > IMPORT_MAX_ERRORS:
+                    messages.append(f"... e mais {len(invalid) - IMPORT_MAX_ERRORS} linha(s) com erros.")
+                raise ValidationError("\n".join(messages))
+
+            cr.execute("SELECT DISTINCT product_tmpl_id FROM pg_packing_import")
+            template_ids = [row[0] for row in cr.fetchall()]
+            # O SQL abaixo não passa pelas regras de registo dos produtos
+            self.env['product.template'].browse(template_ids).check_access_rule('write')
+            cr.execute("DELETE FROM product_packing_volume WHERE product_tmpl_id = ANY(%s)", [template_ids])
+            cr.execute("""
+                INSERT INTO product_packing_volume (product_tmpl_id, sequence, comprimento, altura, largura, quantidade, peso,
+                                                    create_uid, create_date, write_uid, write_date)
+                SELECT product_tmpl_id,
+                       10 * ROW_NUMBER() OVER (PARTITION BY product_tmpl_id ORDER BY line_no),
+                       COALESCE(comprimento, 0), COALESCE(altura, 0), COALESCE(largura, 0),
+                       COALESCE(quantidade, 1), COALESCE(peso, 0),
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                  FROM pg_packing_import
+            """, {'uid': self.env.uid})
+            volume_count = cr.rowcount
+            cr.execute("DROP TABLE pg_packing_import")
+
+        self.env.invalidate_all()
+        _logger.info(
+            "📦 Packing list: %s volume(s) de %s produto(s) importados em %.0f ms",
+            volume_count, len(template_ids), (time.perf_counter() - started) * 1000,
+        )
+        self.browse(template_ids)._recompute_packing_bulk()
+        return {'products': len(template_ids), 'volumes': volume_count}
+
+    def _refresh_packing_totals(self):
+        """
+        Grava volumes, peso e cubicagem dos produtos de ``self`` com um único UPDATE agrupado,
+        com as mesmas regras de ``_compute_packing_volumes_weight`` e ``_compute_packing_cubicagem``;
+        produtos sem dimensões ficam com volumes e cubicagem a zero, como quando a última
+        dimensão é removida.
+        """
+        self.env.cr.execute("""
+            UPDATE product_template t
+               SET packing_volumes = v.volumes,
+                   packing_weight = CASE WHEN v.weight != 0 THEN v.weight ELSE t.packing_weight END,
+                   packing_cubicagem = v.cubicagem
+              FROM (SELECT ids.id AS product_tmpl_id,
+                           COALESCE(SUM(pv.quantidade), 0) AS volumes,
+                           COALESCE(SUM(pv.peso * pv.quantidade), 0) AS weight,
+                           COALESCE(SUM(pv.comprimento * pv.altura * pv.largura * pv.quantidade), 0) AS cubicagem
+                      FROM unnest(%s::integer[]) AS ids(id)
+                 LEFT JOIN product_packing_volume pv ON pv.product_tmpl_id = ids.id
+                  GROUP BY ids.id) v
+             WHERE t.id = v.product_tmpl_id
+        """, [self.ids])
+        self.env.invalidate_all()
+
+    def _recompute_packing_bulk(self):
+        """
+        Recalcula os totais de packing dos produtos de ``self`` e dos documentos que os
+        referem, em vez da cascata de recálculos linha a linha do ORM:
+
+        * produtos, linhas de venda e movimentos de stock com UPDATEs em SQL, por lotes;
+        * totais das vendas e entregas com os métodos de cálculo do ORM, por lotes.
+        """
+        started = time.perf_counter()
+        self.env.flush_all()
+        self._refresh_packing_totals()
+
+        cr = self.env.cr
+        cr.execute("""
+            SELECT l.id
+              FROM sale_order_line l
+              JOIN product_product p ON p.id = l.product_id
+             WHERE p.product_tmpl_id = ANY(%s)
+          ORDER BY l.id
+        """, [self.ids])
+        line_ids = [row[0] for row in cr.fetchall()]
+        order_ids = set()
+        for start in range(0, len(line_ids), RECOMPUTE_BATCH_SIZE):
+            cr.execute("""
+                UPDATE sale_order_line l
+                   SET line_packing_volumes = COALESCE(t.packing_volumes, 0) * l.product_uom_qty,
+                       line_packing_weight = COALESCE(t.packing_weight, 0) * l.product_uom_qty,
+                       line_packing_cubicagem = COALESCE(t.packing_cubicagem, 0) * l.product_uom_qty
+                  FROM product_product p
+                  JOIN product_template t ON t.id = p.product_tmpl_id
+                 WHERE p.id = l.product_id AND l.id = ANY(%s)
+             RETURNING l.order_id
+            """, [line_ids[start:start + RECOMPUTE_BATCH_SIZE]])
+            order_ids.update(row[0] for row in cr.fetchall())
+            self._log_packing_progress('sale.order.line', start, len(line_ids))
+
+        # Movimentos de linhas de venda recebem os valores da linha (ver _sync_move_packing)
+        cr.execute("""
+            SELECT m.id
+              FROM stock_move m
+              JOIN product_product p ON p.id = m.product_id
+             WHERE p.product_tmpl_id = ANY(%s)
+          ORDER BY m.id
+        """, [self.ids])
+        move_ids = [row[0] for row in cr.fetchall()]
+        picking_ids = set()
+        for start in range(0, len(move_ids), RECOMPUTE_BATCH_SIZE):
+            cr.execute("""
+                UPDATE stock_move m
+                   SET move_packing_volumes = COALESCE(l.line_packing_volumes, COALESCE(t.packing_volumes, 0) * m.product_uom_qty),
+                       move_packing_weight = COALESCE(l.line_packing_weight, COALESCE(t.packing_weight, 0) * m.product_uom_qty),
+                       move_packing_cubicagem = COALESCE(l.line_packing_cubicagem, COALESCE(t.packing_cubicagem, 0) * m.product_uom_qty)
+                  FROM product_product p
+                  JOIN product_template t ON t.id = p.product_tmpl_id
+             LEFT JOIN sale_order_line l ON l.id = m.sale_line_id
+                 WHERE p.id = m.product_id AND m.id = ANY(%s)
+             RETURNING m.picking_id
+            """, [move_ids[start:start + RECOMPUTE_BATCH_SIZE]])
+            picking_ids.update(row[0] for row in cr.fetchall() if row[0])
+            self._log_packing_progress('stock.move', start, len(move_ids))
+        self.env.invalidate_all()
+
+        self._recompute_packing_documents('sale.order', sorted(order_ids))
+        self._recompute_packing_documents('stock.picking', sorted(picking_ids))
+        _logger.info(
+            "📦 Packing list: %s produto(s), %s linha(s) de venda, %s movimento(s), %s venda(s) e %s entrega(s) recalculados em %.0f ms",
+            len(self), len(line_ids), len(move_ids), len(order_ids), len(picking_ids), (time.perf_counter() - started) * 1000,
+        )
+
+    @api.model
+    def _recompute_packing_documents(self, model_name, record_ids):
+        """Recalcula os totais de packing dos documentos ``record_ids`` de ``model_name``, por lotes"""
+        Model = self.env[model_name]
+        total_fields = [Model._fields[name] for name in ('total_packing_volumes', 'total_packing_weight', 'total_packing_cubicagem')]
+        for start in range(0, len(record_ids), RECOMPUTE_BATCH_SIZE):
+            records = Model.browse(record_ids[start:start + RECOMPUTE_BATCH_SIZE])
+            for field in total_fields:
+                self.env.add_to_compute(field, records)
+            records.flush_recordset([field.name for field in total_fields])
+            self.env.invalidate_all()
+            self._log_packing_progress(model_name, start, len(record_ids))
 
+    @api.model
+    def _log_packing_progress(self, model_name, start, total):
+        done = min(start + RECOMPUTE_BATCH_SIZE, total)
+        _logger.info("📦 Packing list: %s %s/%s (%.0f%%)", model_name, done, total, done * 100.0 / total)
@@ -77,9 +77,12 @@ class SaleOrderLine(models.Model):
 
     def _sync_move_packing(self):
         """Sincroniza valores de packing com as linhas de stock vinculadas"""
-        moves = self.env['stock.move'].search([('sale_line_id', 'in', self.ids)])
+        line_ids = [line_id for line_id in self.ids if isinstance(line_id, int)]
+        if not line_ids:
+            return
+        moves_by_line = self.env['stock.move'].search([('sale_line_id', 'in', line_ids)]).grouped('sale_line_id')
         for line in self:
-            related_moves = moves.filtered(lambda m: m.sale_line_id == line)
+            related_moves = moves_by_line.get(line)
             if related_moves:
                 related_moves.write({
                     'move_packing_volumes': line.line_packing_volumes,
@@ -109,7 +112,7 @@ class SaleOrderLine(models.Model):
                 line.line_packing_volumes = 0.0
                 line.line_packing_weight = 0.0
                 line.line_packing_cubicagem = 0.0
-            line._sync_move_packing()
+        self._sync_move_packing()
 
     def action_open_line_calc_wizard(self):
         self.ensure_one()
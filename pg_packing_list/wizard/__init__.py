@@ -1,4 +1,4 @@
 # -*- coding: utf-8 -*-
 
 from . import cubicagem_wizard
-
+from . import packing_import_wizard
@@ -13,31 +13,16 @@ class CubicagemWizard(models.TransientModel):
     sale_order_id = fields.Many2one('sale.order', string='Ordem de Venda')
     sale_line_id = fields.Many2one('sale.order.line', string='Linha da Venda')
 
-    volumes = fields.Float(string='Volumes', digits=(4, 2), default=0.0)
-
-    comprimento_1 = fields.Float(string='Comprimento 1', digits=(4, 2), default=0.0)
-    altura_1 = fields.Float(string='Altura 1', digits=(4, 2), default=0.0)
-    largura_1 = fields.Float(string='Largura 1', digits=(4, 2), default=0.0)
-
-    comprimento_2 = fields.Float(string='Comprimento 2', digits=(4, 2), default=0.0)
-    altura_2 = fields.Float(string='Altura 2', digits=(4, 2), default=0.0)
-    largura_2 = fields.Float(string='Largura 2', digits=(4, 2), default=0.0)
-
-    comprimento_3 = fields.Float(string='Comprimento 3', digits=(4, 2), default=0.0)
-    altura_3 = fields.Float(string='Altura 3', digits=(4, 2), default=0.0)
-    largura_3 = fields.Float(string='Largura 3', digits=(4, 2), default=0.0)
-
-    comprimento_4 = fields.Float(string='Comprimento 4', digits=(4, 2), default=0.0)
-    altura_4 = fields.Float(string='Altura 4', digits=(4, 2), default=0.0)
-    largura_4 = fields.Float(string='Largura 4', digits=(4, 2), default=0.0)
-
-    comprimento_5 = fields.Float(string='Comprimento 5', digits=(4, 2), default=0.0)
-    altura_5 = fields.Float(string='Altura 5', digits=(4, 2), default=0.0)
-    largura_5 = fields.Float(string='Largura 5', digits=(4, 2), default=0.0)
+    volumes = fields.Float(
+        string='Volumes',
+        digits=(4, 2),
+        default=0.0,
+        compute='_compute_volumes',
+        store=True,
+        readonly=False
+    )
 
-    comprimento_6 = fields.Float(string='Comprimento 6', digits=(4, 2), default=0.0)
-    altura_6 = fields.Float(string='Altura 6', digits=(4, 2), default=0.0)
-    largura_6 = fields.Float(string='Largura 6', digits=(4, 2), default=0.0)
+    volume_ids = fields.One2many('cubicagem.wizard.volume', 'wizard_id', string='Dimensões')
 
     cubicagem_total = fields.Float(
         string='Cubicagem Total',
@@ -66,27 +51,16 @@ class CubicagemWizard(models.TransientModel):
         help='Peso introduzido manualmente'
     )
 
-    @api.depends('volumes', 'comprimento_1', 'altura_1', 'largura_1',
-                 'comprimento_2', 'altura_2', 'largura_2',
-                 'comprimento_3', 'altura_3', 'largura_3',
-                 'comprimento_4', 'altura_4', 'largura_4',
-                 'comprimento_5', 'altura_5', 'largura_5',
-                 'comprimento_6', 'altura_6', 'largura_6')
+    @api.depends('volume_ids.quantidade')
+    def _compute_volumes(self):
+        for wizard in self:
+            if wizard.volume_ids:
+                wizard.volumes = sum(wizard.volume_ids.mapped('quantidade'))
+
+    @api.depends('volume_ids.cubicagem')
     def _compute_cubicagem_total(self):
         for wizard in self:
-            total = 0.0
-            dims = [
-                (wizard.comprimento_1, wizard.altura_1, wizard.largura_1),
-                (wizard.comprimento_2, wizard.altura_2, wizard.largura_2),
-                (wizard.comprimento_3, wizard.altura_3, wizard.largura_3),
-                (wizard.comprimento_4, wizard.altura_4, wizard.largura_4),
-                (wizard.comprimento_5, wizard.altura_5, wizard.largura_5),
-                (wizard.comprimento_6, wizard.altura_6, wizard.largura_6),
-            ]
-            for i in range(int(min(6, wizard.volumes))):
-                c, a, l = dims[i]
-                total += c * a * l
-            wizard.cubicagem_total = total
+            wizard.cubicagem_total = sum(wizard.volume_ids.mapped('cubicagem'))
 
     def action_calcular(self):
         self.ensure_one()
@@ -163,3 +137,32 @@ class CubicagemWizard(models.TransientModel):
                 'peso_manual_valor': line.line_packing_weight,
             })
         return res
+
+
+class CubicagemWizardVolume(models.TransientModel):
+    _name = 'cubicagem.wizard.volume'
+    _description = 'Dimensões do Assistente de Cubicagem'
+
+    wizard_id = fields.Many2one('cubicagem.wizard', required=True, ondelete='cascade')
+
+    comprimento = fields.Float(string='Comprimento', digits=(4, 2), default=0.0)
+    altura = fields.Float(string='Altura', digits=(4, 2), default=0.0)
+    largura = fields.Float(string='Largura', digits=(4, 2), default=0.0)
+    quantidade = fields.Float(string='Quantidade', digits=(4, 2), default=1.0)
+
+    cubicagem = fields.Float(
+        string='Cubicagem',
+        digits=(4, 2),
+        compute='_compute_cubicagem'
+    )
+
+    @api.constrains('comprimento', 'altura', 'largura', 'quantidade')
+    def _check_dimensions_positive(self):
+        for volume in self:
+            if min(volume.comprimento, volume.altura, volume.largura, volume.quantidade) < 0:
+                raise ValidationError("As dimensões e a quantidade não podem ser negativas.")
+
+    @api.depends('comprimento', 'altura', 'largura', 'quantidade')
+    def _compute_cubicagem(self):
+        for volume in self:
+            volume.cubicagem = volume.comprimento * volume.altura * volume.largura * volume.quantidade
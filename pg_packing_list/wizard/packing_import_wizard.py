@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import csv
+import io
+
+from odoo import models, fields
+from odoo.exceptions import ValidationError
+
+# Colunas da folha de dimensões do fornecedor
+IMPORT_COLUMNS = ['referencia', 'comprimento', 'altura', 'largura', 'quantidade', 'peso']
+
+
+class PackingImportWizard(models.TransientModel):
+    _name = 'packing.import.wizard'
+    _description = 'Importação de Dimensões de Packing List'
+
+    file = fields.Binary(string='Ficheiro CSV', required=True)
+    filename = fields.Char(string='Nome do Ficheiro')
+    delimiter = fields.Selection(
+        [(';', 'Ponto e vírgula (;)'), (',', 'Vírgula (,)'), ('\t', 'Tabulação')],
+        string='Separador',
+        default=';',
+        required=True
+    )
+
+    def _parse_rows(self):
+        """Lê o CSV com as colunas ``IMPORT_COLUMNS``; cada linha é um volume do produto"""
+        content = base64.b64decode(self.file).decode('utf-8-sig')
+        reader = csv.DictReader(io.StringIO(content), delimiter=self.delimiter)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        missing = [name for name in IMPORT_COLUMNS if name not in header]
+        if missing:
+            raise ValidationError(f"Colunas em falta no ficheiro: {', '.join(missing)}.")
+        reader.fieldnames = header
+
+        rows = []
+        for line_no, row in enumerate(reader, start=2):
+            default_code = (row['referencia'] or '').strip()
+            if not default_code:
+                continue
+            values = []
+            for name in IMPORT_COLUMNS[1:]:
+                value = (row[name] or '').strip().replace(',', '.')
+                try:
+                    values.append(float(value) if value else None)
+                except ValueError:
+                    raise ValidationError(f"Linha {line_no}: valor inválido '{row[name]}' na coluna '{name}'.")
+            rows.append((line_no, default_code, *values))
+        return rows
+
+    def action_importar(self):
+        self.ensure_one()
+        result = self.env['product.template']._import_packing_volumes(self._parse_rows())
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Importação de Dimensões',
+                'message': f"{result['volumes']} volume(s) importados para {result['products']} produto(s).",
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
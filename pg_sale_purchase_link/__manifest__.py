@@ -1,11 +1,12 @@
 {
     "name": "Sale to Purchase Link",
-    "version": "1.0",
+    "version": "1.1",
     # ensure procurement_group_id exists and MRP models are available
     "depends": ["sale", "purchase", "sale_stock", "mrp"],
     "data": [
         "security/ir.model.access.csv",  # ✅ Added this line
-        "views/sale_order_views.xml"
+        "views/sale_order_views.xml",
+        "data/sale_supply_link_data.xml",
     ],
     "installable": True
 }
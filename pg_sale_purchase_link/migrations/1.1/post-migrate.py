@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Index the sale order supply links of the existing purchase and manufacturing orders."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['pg.sale.supply.link']._rebuild_links()
@@ -2,3 +2,6 @@ from . import sale_order
 
 from . import mrp_production
 
+from . import purchase_order
+
+from . import sale_supply_link
@@ -1,23 +1,43 @@
-from odoo import models, api
+from odoo import models, fields, api
 
 
 class MrpProduction(models.Model):
     _inherit = 'mrp.production'
 
+    # Indexed for the relinking of renamed sale orders
+    origin = fields.Char(index=True)
+
     @api.model_create_multi
     def create(self, vals_list):
         records = super().create(vals_list)
-        for record, vals in zip(records, vals_list):
-            record._update_procurement_group_from_sale()
+        records.with_context(pg_defer_supply_links=True)._update_procurement_group_from_sale()
+        self.env['pg.sale.supply.link'].sudo()._refresh_links(records)
         return records
 
+    def write(self, vals):
+        res = super().write(vals)
+        if ('origin' in vals or 'procurement_group_id' in vals) and not self.env.context.get('pg_defer_supply_links'):
+            self.env['pg.sale.supply.link'].sudo()._refresh_links(self)
+        return res
+
+    def unlink(self):
+        document_ids, names = self.ids, self.mapped('name')
+        res = super().unlink()
+        self.env['pg.sale.supply.link'].sudo()._remove_links(self._name, document_ids, names)
+        return res
+
     def _update_procurement_group_from_sale(self):
-        for production in self:
-            if not production.origin:
-                continue
-            sale_order = self.env['sale.order'].search([
-                ('name', '=', production.origin)
-            ], limit=1)
-            if sale_order:
-                production.procurement_group_id = sale_order.procurement_group_id.id
+        """Set the procurement group of the sale orders named in ``origin``, resolved with one query for all productions."""
+        productions = self.filtered('origin')
+        if not productions:
+            return
+        group_by_name = {}
+        for sale_order in self.env['sale.order'].search_fetch(
+            [('name', 'in', list(set(productions.mapped('origin'))))],
+            ['name', 'procurement_group_id'],
+        ):
+            group_by_name.setdefault(sale_order.name, sale_order.procurement_group_id.id)
 
+        to_update = productions.filtered(lambda p: p.origin in group_by_name)
+        for group_id, group_productions in to_update.grouped(lambda p: group_by_name[p.origin]).items():
+            group_productions.procurement_group_id = group_id
@@ -0,0 +1,26 @@
+from odoo import models, fields, api
+
+
+class PurchaseOrder(models.Model):
+    _inherit = 'purchase.order'
+
+    # Indexed for the relinking of renamed sale orders
+    origin = fields.Char(index=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['pg.sale.supply.link'].sudo()._refresh_links(records)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if ('origin' in vals or 'group_id' in vals) and not self.env.context.get('pg_defer_supply_links'):
+            self.env['pg.sale.supply.link'].sudo()._refresh_links(self)
+        return res
+
+    def unlink(self):
+        document_ids = self.ids
+        res = super().unlink()
+        self.env['pg.sale.supply.link'].sudo()._remove_links(self._name, document_ids)
+        return res
@@ -1,5 +1,6 @@
 from odoo import models, fields, api
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
@@ -16,23 +17,31 @@ class SaleOrder(models.Model):
         compute="_compute_mrp_production_count",
     )
 
+    supply_link_count = fields.Integer(
+        string="Supply Documents",
+        compute="_compute_supply_link_count",
+    )
+
     @api.depends('procurement_group_id')
     def _compute_purchase_order_count(self):
-        """Count purchase orders linked by procurement group."""
+        """Count purchase orders linked by procurement group, with one grouped query for all orders."""
+        counts = self._count_by_procurement_group('purchase.order', 'group_id')
         for order in self:
-            group = order.procurement_group_id
-            if group:
-                domain = [('group_id', '=', group.id)]
-                count = self.env['purchase.order'].search_count(domain)
-                _logger.debug(
-                    "Found %s purchase orders for SO %s via group %s",
-                    count,
-                    order.name,
-                    group.id,
-                )
-                order.purchase_order_count = count
-            else:
-                order.purchase_order_count = 0
+            order.purchase_order_count = counts.get(order.procurement_group_id.id, 0)
+
+    def _count_by_procurement_group(self, model, group_field):
+        """Return ``{procurement group id: number of ``model`` records}`` for the groups of ``self``."""
+        group_ids = [group_id for group_id in self.procurement_group_id.ids if isinstance(group_id, int)]
+        if not group_ids:
+            return {}
+        counts = {
+            group.id: count
+            for group, count in self.env[model]._read_group(
+                [(group_field, 'in', group_ids)], [group_field], ['__count'],
+            )
+        }
+        _logger.debug("Found %s records of %s for %s procurement group(s)", sum(counts.values()), model, len(group_ids))
+        return counts
 
     def action_view_related_purchase_orders(self):
         self.ensure_one()
@@ -47,21 +56,10 @@ class SaleOrder(models.Model):
 
     @api.depends('procurement_group_id')
     def _compute_mrp_production_count(self):
-        """Count manufacturing orders linked by procurement group."""
+        """Count manufacturing orders linked by procurement group, with one grouped query for all orders."""
+        counts = self._count_by_procurement_group('mrp.production', 'procurement_group_id')
         for order in self:
-            group = order.procurement_group_id
-            if group:
-                domain = [('procurement_group_id', '=', group.id)]
-                mo_count = self.env['mrp.production'].search_count(domain)
-                _logger.debug(
-                    "Found %s manufacturing orders for SO %s via group %s",
-                    mo_count,
-                    order.name,
-                    group.id,
-                )
-                order.mrp_production_count = mo_count
-            else:
-                order.mrp_production_count = 0
+            order.mrp_production_count = counts.get(order.procurement_group_id.id, 0)
 
     def action_view_related_mos(self):
         self.ensure_one()
@@ -74,25 +72,77 @@ class SaleOrder(models.Model):
             'context': {'create': False},
         }
 
+    def _compute_supply_link_count(self):
+        """Count the documents of the whole supply chain, from the link index."""
+        order_ids = [order_id for order_id in self.ids if isinstance(order_id, int)]
+        counts = {}
+        if order_ids:
+            counts = {
+                order.id: count
+                for order, count in self.env['pg.sale.supply.link']._read_group(
+                    [('sale_order_id', 'in', order_ids)], ['sale_order_id'], ['__count'],
+                )
+            }
+        for order in self:
+            order.supply_link_count = counts.get(order.id, 0)
+
+    def action_view_supply_chain(self):
+        """Purchase and manufacturing orders supplying this order, at any depth."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Supply Chain',
+            'res_model': 'pg.sale.supply.link',
+            'view_mode': 'list',
+            'domain': [('sale_order_id', '=', self.id)],
+            'context': {'create': False},
+        }
+
+    def write(self, vals):
+        old_group_ids = self.procurement_group_id.ids if 'procurement_group_id' in vals else []
+        res = super().write(vals)
+        if 'procurement_group_id' in vals and not self.env.context.get('pg_defer_supply_links'):
+            # Documents of the old and new groups are linked to other orders now
+            group_ids = list(set(old_group_ids) | set(self.procurement_group_id.ids))
+            self.env['pg.sale.supply.link'].sudo()._refresh_group_links(group_ids)
+        return res
+
     def action_confirm(self):
         old_names = {order.id: order.name for order in self}
         res = super().action_confirm()
-        for order in self:
-            old_name = old_names.get(order.id)
-            new_name = order.name
-            if old_name and new_name and old_name != new_name:
-                purchases = self.env['purchase.order'].search([
-                    ('origin', '=', old_name)
-                ])
-                if purchases:
-                    purchases.write({'origin': new_name})
-                mos = self.env['mrp.production'].search([
-                    ('origin', '=', old_name)
-                ])
-                if mos:
-                    mos.write({
-                        'origin': new_name,
-                        'procurement_group_id': order.procurement_group_id.id,
-                    })
+        started = time.perf_counter()
+        renamed = {
+            old_names[order.id]: order
+            for order in self
+            if old_names.get(order.id) and order.name and old_names[order.id] != order.name
+        }
+        if renamed:
+            links = self.env['pg.sale.supply.link'].sudo()
+            purchases = links._search_by_origin('purchase.order', renamed)
+            mos = links._search_by_origin('mrp.production', renamed)
+            # Links are refreshed once for all the documents below, not on every write
+            for origin, orders in purchases.grouped('origin').items():
+                orders.with_context(pg_defer_supply_links=True).write({'origin': self._rename_origin(origin, renamed)[0]})
+            for origin, productions in mos.grouped('origin').items():
+                new_origin, order = self._rename_origin(origin, renamed)
+                productions.with_context(pg_defer_supply_links=True).write({
+                    'origin': new_origin,
+                    'procurement_group_id': order.procurement_group_id.id,
+                })
+            links._refresh_links(purchases)
+            links._refresh_links(mos)
+            _logger.info(
+                "Relinked %s purchase order(s) and %s manufacturing order(s) of %s renamed sale order(s) in %.0f ms",
+                len(purchases), len(mos), len(renamed), (time.perf_counter() - started) * 1000,
+            )
         return res
 
+    @api.model
+    def _rename_origin(self, origin, renamed):
+        """
+        Return ``origin`` with the old names of ``renamed`` ({old name: sale order}) replaced
+        by the new ones, and the first renamed sale order it names.
+        """
+        parts = [part.strip() for part in origin.split(',')]
+        order = next(renamed[part] for part in parts if part in renamed)
+        return ', '.join(renamed[part].name if part in renamed else part for part in parts), order
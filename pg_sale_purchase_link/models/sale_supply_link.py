@@ -0,0 +1,174 @@
+from collections import defaultdict
+
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Levels of component manufacturing orders followed below a sale order
+MAX_SUPPLY_DEPTH = 10
+REBUILD_BATCH_SIZE = 1000
+
+SUPPLY_MODELS = [
+    ('purchase.order', 'Purchase Order'),
+    ('mrp.production', 'Manufacturing Order'),
+]
+
+
+class SaleSupplyLink(models.Model):
+    """
+    Persisted index of the purchase and manufacturing orders supplying a sale order,
+    directly (procurement group or origin) or through component manufacturing orders.
+    It is updated when the origin or procurement group of those documents changes.
+    """
+    _name = 'pg.sale.supply.link'
+    _description = 'Sale Order Supply Link'
+    _order = 'sale_order_id, depth, res_model, res_id'
+
+    sale_order_id = fields.Many2one('sale.order', required=True, ondelete='cascade', index=True)
+    res_model = fields.Selection(SUPPLY_MODELS, string='Document Type', required=True)
+    res_id = fields.Integer(string='Document ID', required=True)
+    document_ref = fields.Reference(SUPPLY_MODELS, string='Document', readonly=True)
+    name = fields.Char(string='Reference')
+    parent_ref = fields.Reference(
+        [('sale.order', 'Sale Order')] + SUPPLY_MODELS,
+        string='Supplies',
+        readonly=True,
+    )
+    depth = fields.Integer(help="1 for documents linked to the sale order itself, 2 for the components of those, etc.")
+
+    _sql_constraints = [
+        ('link_uniq', 'UNIQUE(sale_order_id, res_model, res_id)', 'A document is linked once per sale order.'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS pg_sale_supply_link_document_index
+                ON pg_sale_supply_link (res_model, res_id)
+        """)
+
+    @api.model
+    def _refresh_links(self, documents, level=0):
+        """
+        Recompute the links of ``documents`` (purchase or manufacturing orders) and then
+        of the documents whose origin is one of the manufacturing orders among them.
+        """
+        if not documents:
+            return
+        self.search([('res_model', '=', documents._name), ('res_id', 'in', documents.ids)]).unlink()
+
+        group_field = 'group_id' if documents._name == 'purchase.order' else 'procurement_group_id'
+        origins = {
+            document.id: [origin.strip() for origin in (document.origin or '').split(',') if origin.strip()]
+            for document in documents
+        }
+        names = list(set().union(*origins.values()))
+        group_ids = documents[group_field].ids
+
+        sale_by_name, sale_by_group = {}, {}
+        if names or group_ids:
+            for order in self.env['sale.order'].search_fetch(
+                ['|', ('name', 'in', names), ('procurement_group_id', 'in', group_ids)],
+                ['name', 'procurement_group_id'],
+            ):
+                sale_by_name.setdefault(order.name, order.id)
+                if order.procurement_group_id:
+                    sale_by_group.setdefault(order.procurement_group_id.id, order.id)
+
+        # Links of the parent manufacturing orders named in the origins
+        mo_by_name = {}
+        if names:
+            mo_by_name = {mo.name: mo for mo in self.env['mrp.production'].search_fetch([('name', 'in', names)], ['name'])}
+        parent_links = defaultdict(list)  # parent MO id -> [(sale order id, depth)]
+        for link in self.search_fetch(
+            [('res_model', '=', 'mrp.production'), ('res_id', 'in', [mo.id for mo in mo_by_name.values()])],
+            ['sale_order_id', 'res_id', 'depth'],
+        ):
+            parent_links[link.res_id].append((link.sale_order_id.id, link.depth))
+
+        vals_list = []
+        for document in documents:
+            found = {}  # sale order id -> (depth, parent reference)
+            group_sale = sale_by_group.get(document[group_field].id)
+            if group_sale:
+                found[group_sale] = (1, f'sale.order,{group_sale}')
+            for origin in origins[document.id]:
+                if origin in sale_by_name:
+                    found.setdefault(sale_by_name[origin], (1, f'sale.order,{sale_by_name[origin]}'))
+                parent = mo_by_name.get(origin)
+                if parent and parent != document:
+                    for sale_id, depth in parent_links[parent.id]:
+                        if sale_id not in found or found[sale_id][0] > depth + 1:
+                            found[sale_id] = (depth + 1, f'mrp.production,{parent.id}')
+            vals_list += [
+                {
+                    'sale_order_id': sale_id,
+                    'res_model': document._name,
+                    'res_id': document.id,
+                    'document_ref': f'{document._name},{document.id}',
+                    'name': document.name,
+                    'parent_ref': parent_ref,
+                    'depth': depth,
+                }
+                for sale_id, (depth, parent_ref) in found.items()
+            ]
+        self.create(vals_list)
+
+        # Component documents created from these manufacturing orders follow them
+        if documents._name == 'mrp.production' and level < MAX_SUPPLY_DEPTH:
+            names = documents.mapped('name')
+            self._refresh_links(self._search_by_origin('mrp.production', names) - documents, level + 1)
+            self._refresh_links(self._search_by_origin('purchase.order', names), level + 1)
+
+    @api.model
+    def _remove_links(self, model, document_ids, names=()):
+        """
+        Drop the links of the deleted ``document_ids`` of ``model`` and refresh the documents
+        whose origin is one of their ``names``, which no longer follow them.
+        """
+        self.search([('res_model', '=', model), ('res_id', 'in', document_ids)]).unlink()
+        if model == 'mrp.production' and names:
+            self._refresh_links(self._search_by_origin('mrp.production', names), 1)
+            self._refresh_links(self._search_by_origin('purchase.order', names), 1)
+
+    @api.model
+    def _refresh_group_links(self, group_ids):
+        """Refresh the purchase and manufacturing orders of the procurement groups ``group_ids``."""
+        if not group_ids:
+            return
+        self._refresh_links(self.env['purchase.order'].search([('group_id', 'in', group_ids)]))
+        self._refresh_links(self.env['mrp.production'].search([('procurement_group_id', 'in', group_ids)]))
+
+    @api.model
+    def _search_by_origin(self, model, names):
+        """
+        Return the records of ``model`` with one of ``names`` in their origin, which may list
+        several documents separated by commas ("MO/001, MO/002"). Single origins are matched
+        through the index on the column, merged ones by splitting them.
+        """
+        names = list(set(names))
+        records = self.env[model]
+        if not names:
+            return records
+        records.flush_model(['origin'])
+        self.env.cr.execute(f"""
+            SELECT id
+              FROM {records._table}
+             WHERE origin = ANY(%(names)s)
+                OR (origin LIKE '%%,%%' AND EXISTS (
+                        SELECT 1
+                          FROM unnest(string_to_array(origin, ',')) AS part
+                         WHERE trim(part) = ANY(%(names)s)))
+        """, {'names': names})
+        return records.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _rebuild_links(self):
+        """Index every purchase and manufacturing order; run on install."""
+        self.search([]).unlink()
+        for model in ('mrp.production', 'purchase.order'):
+            document_ids = self.env[model].search([], order='id').ids
+            for start in range(0, len(document_ids), REBUILD_BATCH_SIZE):
+                self._refresh_links(self.env[model].browse(document_ids[start:start + REBUILD_BATCH_SIZE]))
+                self.env.invalidate_all()
+            _logger.info("Indexed the sale order links of %s %s record(s)", len(document_ids), model)